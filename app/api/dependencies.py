@@ -0,0 +1,50 @@
+"""
+Shared request dependencies.
+"""
+import hmac
+import random
+from typing import AsyncContextManager, Callable, Optional
+from fastapi import Header, HTTPException, Request
+from app.api.middleware import request_priority
+from app.core.config import settings
+from app.services.admission import admission
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    # compare bytes: compare_digest rejects non-ASCII str with TypeError
+    return (
+        bool(settings.ADMIN_TOKEN)
+        and bool(token)
+        and hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+    )
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")) -> None:
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def profiling_requested(
+    x_profile: Optional[str] = Header(None, alias="X-Profile"),
+    x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")
+) -> bool:
+    """
+    Profile this request? Either an admin asked via `X-Profile: 1`, or it was
+    picked by PROFILE_SAMPLE_RATE. X-Profile without a valid token is ignored.
+    """
+    if x_profile and x_profile != "0" and is_admin_token(x_admin_token):
+        return True
+    return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def cpu_slot(default_class: str) -> Callable[[Request], AsyncContextManager[None]]:
+    """
+    Dependency factory: an admission slot of `default_class` (or batch, on
+    `X-Priority: batch`) for the route to hold around its CPU-heavy stage
+    only, not while the request body is still arriving.
+    """
+    def dependency(request: Request) -> AsyncContextManager[None]:
+        class_name, device = request_priority(request.headers.items(), request.client, default_class)
+        return admission.admit(class_name, device)
+
+    return dependency
@@ -0,0 +1,72 @@
+"""
+ASGI middleware that runs HTTP requests through admission control.
+
+Only cheap, CPU-bound requests are gated here for their whole lifetime.
+Upload routes take a slot just around their analysis stage instead (see
+dependencies.cpu_slot), so slow body transfers and status polls never hold
+one.
+"""
+import json
+import math
+from typing import Iterable, Optional, Tuple
+from app.services.admission import BATCH, INTERACTIVE, AdmissionController, AdmissionRejected
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Priority class for a request, or None to let it through unmanaged."""
+    if path == "/analysis/landmarks" and method == "POST":
+        return INTERACTIVE
+    return None
+
+
+def request_priority(headers: Iterable[Tuple[str, str]], client, default: str) -> Tuple[str, str]:
+    """
+    (priority class, device key) for a request. Clients can demote
+    themselves to the batch class with `X-Priority: batch`; promotion is not
+    possible. The device is the X-Device header, else the client address.
+    """
+    headers = {key.lower(): value for key, value in headers}
+    class_name = BATCH if headers.get("x-priority", "").lower() == BATCH else default
+    device = headers.get("x-device") or (client[0] if client else "unknown")
+    return class_name, device
+
+
+def rejection_headers(rejection: AdmissionRejected) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(rejection.retry_after)))}
+
+
+class AdmissionMiddleware:
+    """
+    Holds a slot of the request's priority class until the response finishes.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        class_name = classify(scope["method"], scope["path"])
+        if class_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = [(key.decode("latin-1"), value.decode("latin-1")) for key, value in scope["headers"]]
+        class_name, device = request_priority(headers, scope.get("client"), class_name)
+
+        try:
+            async with self.controller.admit(class_name, device):
+                await self.app(scope, receive, send)
+        except AdmissionRejected as e:
+            await self._reject(send, e)
+
+    @staticmethod
+    async def _reject(send, rejection: AdmissionRejected) -> None:
+        body = json.dumps({"detail": rejection.detail}).encode()
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        headers += [(key.lower().encode(), value.encode()) for key, value in rejection_headers(rejection).items()]
+        await send({"type": "http.response.start", "status": rejection.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
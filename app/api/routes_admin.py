@@ -0,0 +1,39 @@
+"""
+Admin-only endpoints (require X-Admin-Token = ADMIN_TOKEN).
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from app.api.dependencies import require_admin
+from app.services.admission import admission
+from app.services.profiling import get_profile_path, list_profiles
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+async def get_profiles():
+    """
+    List stored request profiles (ID = scan ID or analysis ID).
+    """
+    profiles = list_profiles()
+    return {"profiles": profiles, "total": len(profiles)}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """
+    Download a profile in folded-stack format (feed to flamegraph.pl / speedscope).
+    """
+    path = get_profile_path(profile_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path=path, filename=f"{profile_id}.folded", media_type="text/plain")
+
+
+@router.get("/admission")
+async def get_admission_stats():
+    """
+    Per priority class: active / queued requests and admitted / shed / rate-limited counts.
+    """
+    return admission.stats()
@@ -1,7 +1,15 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import json
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from app.api.dependencies import cpu_slot, profiling_requested
 from app.models.analysis import AnalysisResult
 from app.models.landmarks import LandmarkRequest
+from app.models.landmark_set import LandmarkSet
+from app.services.admission import UPLOAD
+from app.services.analysis_cache import analysis_cache, analyze_landmarks_cached
 from app.services.facial_analysis import analyze_landmarks
+from app.services.landmark_stream import LandmarkStreamSession
+from app.services.profiling import maybe_profile, save_profile
 from app.services.storage import save_scan_and_analyze
 
 
@@ -9,20 +17,82 @@ router = APIRouter(prefix="/analysis", tags=["analysis"])
 
 
 @router.post("/landmarks", response_model=AnalysisResult)
-async def analyze_from_landmarks(payload: LandmarkRequest):
+async def analyze_from_landmarks(payload: LandmarkRequest, profile: bool = Depends(profiling_requested)):
     """
     iOS → MediaPipe → this endpoint.
-    Send: { "landmarks": [{x,y,z}, ...], "device": "iPhone..." }
+    Send: { "landmarks": [{x,y,z[,name]}, ...], "device": "iPhone..." }
     """
     if not payload.landmarks:
         raise HTTPException(status_code=400, detail="No landmarks provided")
 
-    result = analyze_landmarks([lm.dict() for lm in payload.landmarks])
+    landmarks = LandmarkSet.from_models(payload.landmarks)
+    if profile:
+        # bypass the cache so the profile shows the real pipeline
+        with maybe_profile(True) as profiler:
+            result = analyze_landmarks(landmarks)
+        save_profile(result.id, profiler)
+        return result
+
+    # retries / re-renders with (nearly) identical landmarks hit the cache
+    result = analyze_landmarks_cached(landmarks)
     return result
 
 
+@router.get("/landmarks/cache-stats")
+async def landmark_cache_stats():
+    """
+    Hit rate and size of the /analysis/landmarks result cache.
+    """
+    return analysis_cache.stats()
+
+
+@router.websocket("/landmarks/stream")
+async def stream_landmarks(websocket: WebSocket):
+    """
+    iOS → MediaPipe (per frame) → this socket.
+    Send one LandmarkRequest JSON per frame (text, or UTF-8 in a binary
+    frame); an AnalysisResult is pushed back only when the recommendations
+    change, including the values quoted in them (measurements are
+    median-filtered over the last few frames of the session).
+    """
+    await websocket.accept()
+    session = LandmarkStreamSession()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            text = message.get("text")
+            if text is None:
+                data = message.get("bytes") or b""
+                try:
+                    text = data.decode("utf-8")
+                except UnicodeDecodeError:
+                    await websocket.send_json({"error": "Binary frames must be UTF-8 encoded JSON"})
+                    continue
+            try:
+                payload = LandmarkRequest(**json.loads(text))
+            except (ValueError, TypeError, ValidationError):
+                await websocket.send_json({"error": "Invalid landmark frame"})
+                continue
+            if not payload.landmarks:
+                await websocket.send_json({"error": "No landmarks provided"})
+                continue
+
+            result = session.push(LandmarkSet.from_models(payload.landmarks))
+            if result is not None:
+                await websocket.send_json(result.dict())
+    except WebSocketDisconnect:
+        pass
+
+
 @router.post("/scan", response_model=AnalysisResult)
-async def analyze_from_scan(file: UploadFile = File(...)):
+async def analyze_from_scan(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    profile: bool = Depends(profiling_requested),
+    slot=Depends(cpu_slot(UPLOAD))
+):
     """
     iOS → ARKit → upload 3D scan (usdz/obj/glb).
     Stores scan and runs analysis. Scan can be accessed via /scans/ endpoints.
@@ -30,7 +100,11 @@ async def analyze_from_scan(file: UploadFile = File(...)):
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
 
-    result, scan_id = await save_scan_and_analyze(file)
+    async with slot:
+        with maybe_profile(profile) as profiler:
+            result, scan_id = await save_scan_and_analyze(file, background_tasks=background_tasks)
+    if profiler:
+        save_profile(scan_id, profiler)
     result.id = scan_id  # Use scan_id as result ID
     return result
 
@@ -2,10 +2,18 @@
 API routes for managing and accessing 3D scans.
 Allows listing and downloading scans from a computer.
 """
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from app.api.dependencies import cpu_slot
+from app.models.analysis import AnalysisResult
 from app.models.scan import ScanListResponse
-from app.services.scan_manager import get_all_scans, get_scan_by_id
+from app.services.admission import BATCH
+from app.services.cold_storage import get_cold_entry, iter_cold_scan
+from app.services.preview import generate_previews, preview_lods
+from app.services.scan_layout import preview_path
+from app.services.scan_manager import get_all_scans, get_scan_by_id, get_analysis_result
 import os
 
 
@@ -36,6 +44,18 @@ async def get_scan(scan_id: str):
     return scan
 
 
+@router.get("/{scan_id}/analysis", response_model=AnalysisResult)
+async def get_scan_analysis(scan_id: str):
+    """
+    Get the latest analysis result stored for a scan
+    (updated by `python -m app.reanalyze`).
+    """
+    result = get_analysis_result(scan_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return result
+
+
 @router.get("/{scan_id}/download")
 async def download_scan(scan_id: str):
     """
@@ -46,12 +66,56 @@ async def download_scan(scan_id: str):
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
     
-    if not os.path.exists(scan.file_path):
+    if os.path.exists(scan.file_path):
+        return FileResponse(
+            path=scan.file_path,
+            filename=scan.filename,
+            media_type="application/octet-stream"
+        )
+    
+    # Not in the hot tier (anymore): serve it out of its cold pack
+    entry = get_cold_entry(scan.id)
+    if not entry:
         raise HTTPException(status_code=404, detail="Scan file not found on server")
     
-    return FileResponse(
-        path=scan.file_path,
-        filename=scan.filename,
-        media_type="application/octet-stream"
+    return StreamingResponse(
+        iter_cold_scan(entry),
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": f'attachment; filename="{scan.filename}"',
+            "Content-Length": str(entry["size"]),
+        }
     )
 
+
+
+@router.get("/{scan_id}/preview")
+async def preview_scan(scan_id: str, lod: Optional[int] = None, slot=Depends(cpu_slot(BATCH))):
+    """
+    Low-poly GLB preview of a scan (`lod` = face budget, default: smallest).
+    Landmarks are embedded as glTF scene extras. Much smaller than /download.
+    Previews that still have to be built take a batch admission slot.
+    """
+    lods = preview_lods()
+    lod = lod or lods[0]
+    if lod not in lods:
+        raise HTTPException(status_code=400, detail=f"lod must be one of {lods}")
+
+    scan = get_scan_by_id(scan_id)
+    if not scan:
+        raise HTTPException(status_code=404, detail="Scan not found")
+
+    path = preview_path(scan.file_path, lod)
+    if not os.path.exists(path) and os.path.exists(scan.file_path):
+        # Background task hasn't run yet (or scan predates previews)
+        async with slot:
+            if not os.path.exists(path):
+                await run_in_threadpool(generate_previews, scan.id, scan.file_path)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Preview not available")
+
+    return FileResponse(
+        path=path,
+        filename=f"{scan.id}.lod{lod}.glb",
+        media_type="model/gltf-binary"
+    )
@@ -0,0 +1,107 @@
+"""
+Resumable chunked uploads for large scans.
+
+    POST /uploads/                          → create session (returns upload_id, chunk_size)
+    PUT  /uploads/{upload_id}/chunks/{i}    → body = raw chunk bytes, ?offset=..., X-Chunk-SHA256
+    GET  /uploads/{upload_id}               → received ranges / missing chunks
+    POST /uploads/{upload_id}/finalize      → runs the normal scan analysis
+
+After a dropped connection, GET the session and re-send only missing_chunks.
+"""
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request
+from app.api.dependencies import cpu_slot, profiling_requested
+from app.models.analysis import AnalysisResult
+from app.models.upload import UploadSessionCreate, UploadSessionStatus
+from app.services.admission import UPLOAD
+from app.services import chunked_upload
+from app.services.profiling import maybe_profile, run_in_worker, save_profile
+
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+
+@router.post("/", response_model=UploadSessionStatus)
+async def create_upload(payload: UploadSessionCreate):
+    """
+    Start a resumable upload. Send chunks of `chunk_size` bytes afterwards.
+    """
+    try:
+        return chunked_upload.create_session(payload)
+    except chunked_upload.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{upload_id}", response_model=UploadSessionStatus)
+async def get_upload(upload_id: str):
+    """
+    Which byte ranges have arrived so far.
+    """
+    status = chunked_upload.get_status(upload_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return status
+
+
+@router.put("/{upload_id}/chunks/{index}", response_model=UploadSessionStatus)
+async def put_chunk(
+    upload_id: str,
+    index: int,
+    offset: int,
+    request: Request,
+    chunk_sha256: str = Header(..., alias="X-Chunk-SHA256")
+):
+    """
+    Store chunk `index` (bytes [offset, offset + len)). Safe to retry.
+    Bodies larger than the session's chunk_size get 413 before being buffered.
+    """
+    limit = chunked_upload.get_chunk_size(upload_id)
+    if limit is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    too_large = HTTPException(status_code=413, detail=f"chunk must be at most {limit} bytes")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise too_large
+
+    # Content-Length may be absent (chunked transfer) or wrong: count as we read
+    data = bytearray()
+    async for part in request.stream():
+        data += part
+        if len(data) > limit:
+            raise too_large
+    data = bytes(data)
+    try:
+        status = await run_in_worker(chunked_upload.write_chunk, upload_id, index, offset, data, chunk_sha256)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not status:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return status
+
+
+@router.post("/{upload_id}/finalize", response_model=AnalysisResult)
+async def finalize_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    profile: bool = Depends(profiling_requested),
+    slot=Depends(cpu_slot(UPLOAD))
+):
+    """
+    Assemble the upload into a scan and analyze it (same result as /analyze-scan).
+    Only this step takes an upload admission slot; chunk transfers don't.
+    """
+    try:
+        async with slot:
+            with maybe_profile(profile) as profiler:
+                finalized = await run_in_worker(chunked_upload.finalize, upload_id, background_tasks=background_tasks)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not finalized:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+    result, scan_id = finalized
+    if profiler:
+        save_profile(scan_id, profiler)
+    result.id = scan_id  # Use scan_id as result ID, like /analyze-scan
+    return result
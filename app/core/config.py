@@ -5,8 +5,50 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Rhinovate API"
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
+    # scans older than this many days move to the packed cold tier (0 = keep everything hot)
+    RETENTION_DAYS: int = int(os.getenv("RETENTION_DAYS", "0"))
+    # resumable uploads: chunk size in bytes, hours before an unfinished session is garbage-collected
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(5 * 1024 * 1024)))
+    UPLOAD_SESSION_TTL_HOURS: float = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+    # largest scan a resumable upload session may announce, in bytes
+    MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", str(2 * 1024 * 1024 * 1024)))
+    # face budgets of the GLB previews generated for each scan
+    PREVIEW_LODS: str = os.getenv("PREVIEW_LODS", "5000,20000")
+    # admin endpoints / X-Profile header are disabled while this is empty
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    # fraction of scan / landmark requests profiled without being asked (0 = only on X-Profile)
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    # stored profiles older than this, or beyond the newest N, are deleted by manage_storage gc
+    PROFILE_RETENTION_HOURS: float = float(os.getenv("PROFILE_RETENTION_HOURS", "168"))
+    PROFILE_MAX_COUNT: int = int(os.getenv("PROFILE_MAX_COUNT", "1000"))
+    # admission control: concurrent requests, queued requests beyond that (then 503),
+    # and per-device token bucket (requests/second, burst; rate 0 = no limit) per class
+    ADMISSION_INTERACTIVE_CONCURRENCY: int = int(os.getenv("ADMISSION_INTERACTIVE_CONCURRENCY", "16"))
+    ADMISSION_INTERACTIVE_QUEUE: int = int(os.getenv("ADMISSION_INTERACTIVE_QUEUE", "64"))
+    ADMISSION_INTERACTIVE_RATE: float = float(os.getenv("ADMISSION_INTERACTIVE_RATE", "10"))
+    ADMISSION_INTERACTIVE_BURST: float = float(os.getenv("ADMISSION_INTERACTIVE_BURST", "30"))
+    ADMISSION_UPLOAD_CONCURRENCY: int = int(os.getenv("ADMISSION_UPLOAD_CONCURRENCY", "2"))
+    ADMISSION_UPLOAD_QUEUE: int = int(os.getenv("ADMISSION_UPLOAD_QUEUE", "16"))
+    ADMISSION_UPLOAD_RATE: float = float(os.getenv("ADMISSION_UPLOAD_RATE", "2"))
+    ADMISSION_UPLOAD_BURST: float = float(os.getenv("ADMISSION_UPLOAD_BURST", "20"))
+    ADMISSION_BATCH_CONCURRENCY: int = int(os.getenv("ADMISSION_BATCH_CONCURRENCY", "1"))
+    ADMISSION_BATCH_QUEUE: int = int(os.getenv("ADMISSION_BATCH_QUEUE", "4"))
+    ADMISSION_BATCH_RATE: float = float(os.getenv("ADMISSION_BATCH_RATE", "1"))
+    ADMISSION_BATCH_BURST: float = float(os.getenv("ADMISSION_BATCH_BURST", "10"))
     # put your model paths here if you add beauty models
     AESTHETIC_MODEL_PATH: str = os.getenv("AESTHETIC_MODEL_PATH", "")
+    # keep parsed vertex arrays as memory-mapped .npy sidecars next to scans
+    VERTEX_CACHE: bool = os.getenv("VERTEX_CACHE", "1") != "0"
+    # neighbourhood used to refine extreme-vertex landmarks (radius 0 = k-NN only, mesh units)
+    LANDMARK_REFINE_K: int = int(os.getenv("LANDMARK_REFINE_K", "16"))
+    LANDMARK_REFINE_RADIUS: float = float(os.getenv("LANDMARK_REFINE_RADIUS", "0"))
+    # memoized /analysis/landmarks results (tolerance in landmark units, <= 0 = exact; TTL in seconds)
+    ANALYSIS_CACHE_SIZE: int = int(os.getenv("ANALYSIS_CACHE_SIZE", "1024"))
+    ANALYSIS_CACHE_TTL: float = float(os.getenv("ANALYSIS_CACHE_TTL", "300"))
+    ANALYSIS_CACHE_TOLERANCE: float = float(os.getenv("ANALYSIS_CACHE_TOLERANCE", "1e-4"))
+    # number of recent frames the landmark stream takes the median over
+    STREAM_MEDIAN_WINDOW: int = int(os.getenv("STREAM_MEDIAN_WINDOW", "15"))
 
     class Config:
         case_sensitive = False
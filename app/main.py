@@ -1,6 +1,11 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Header
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header, BackgroundTasks, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import routes_analysis, routes_scans
+from fastapi.responses import JSONResponse
+from app.api import routes_admin, routes_analysis, routes_scans, routes_uploads
+from app.api.dependencies import cpu_slot, profiling_requested
+from app.api.middleware import AdmissionMiddleware, rejection_headers
+from app.services.admission import UPLOAD, AdmissionRejected, admission
+from app.services.profiling import maybe_profile, save_profile
 from app.services.storage import save_scan_and_analyze
 from app.models.analysis import AnalysisResult
 from typing import Optional
@@ -11,6 +16,16 @@ app = FastAPI(
     description="Backend for Rhinovate iOS app — analyzes landmarks or 3D scans and returns cosmetic suggestions."
 )
 
+# interactive priority class, per-device rate limits
+# (added first so CORS stays outermost and also covers rejections)
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    # raised by routes holding a cpu_slot (upload / batch classes)
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=rejection_headers(exc))
+
 # allow iOS simulator / device
 app.add_middleware(
     CORSMiddleware,
@@ -23,6 +38,8 @@ app.add_middleware(
 # include routes
 app.include_router(routes_analysis.router)
 app.include_router(routes_scans.router)
+app.include_router(routes_uploads.router)
+app.include_router(routes_admin.router)
 
 
 @app.get("/")
@@ -32,16 +49,22 @@ def read_root():
         "service": "rhinovate",
         "endpoints": {
             "upload": "/analyze-scan",
+            "resumable_upload": "/uploads/",
+            "stream_landmarks": "/analysis/landmarks/stream",
             "list_scans": "/scans/",
-            "download_scan": "/scans/{scan_id}/download"
+            "download_scan": "/scans/{scan_id}/download",
+            "preview_scan": "/scans/{scan_id}/preview?lod=5000"
         }
     }
 
 
 @app.post("/analyze-scan", response_model=AnalysisResult)
 async def analyze_scan(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    device: Optional[str] = Header(None, alias="X-Device")
+    device: Optional[str] = Header(None, alias="X-Device"),
+    profile: bool = Depends(profiling_requested),
+    slot=Depends(cpu_slot(UPLOAD))
 ):
     """
     Direct endpoint matching iOS app: POST /analyze-scan
@@ -52,7 +75,12 @@ async def analyze_scan(
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
 
-    result, scan_id = await save_scan_and_analyze(file, device=device)
+    # the upload body has already arrived; only analysis holds an upload slot
+    async with slot:
+        with maybe_profile(profile) as profiler:
+            result, scan_id = await save_scan_and_analyze(file, device=device, background_tasks=background_tasks)
+    if profiler:
+        save_profile(scan_id, profiler)
     # Include scan_id in response for reference
     result.id = scan_id  # Use scan_id as the result ID so it can be used to download
     return result
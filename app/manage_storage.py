@@ -0,0 +1,72 @@
+"""
+Maintenance commands for the scan store.
+
+    python -m app.manage_storage migrate            # flat UPLOAD_DIR → sharded tree
+    python -m app.manage_storage retention --days 90
+    python -m app.manage_storage gc                 # delete orphaned files, stale uploads, old profiles
+
+Every command accepts --dry-run to only report what it would do. Commands
+abort without changing anything if scans_metadata.json or the cold index
+can't be read; gc also refuses to run against empty metadata while scan
+files exist (override with --force).
+"""
+import argparse
+from app.core.config import settings
+from app.services.chunked_upload import collect_stale_sessions
+from app.services.cold_storage import apply_retention, collect_cold_orphans
+from app.services.profiling import prune_profiles
+from app.services.scan_layout import collect_orphans, migrate_flat_layout
+from app.services.scan_manager import MetadataError
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scan storage maintenance.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="move flat scan files into the sharded layout")
+    migrate.add_argument("--dry-run", action="store_true")
+
+    retention = commands.add_parser("retention", help="pack old scans into the cold tier")
+    retention.add_argument("--days", type=int, default=settings.RETENTION_DAYS,
+                           help="move scans older than this (default: RETENTION_DAYS)")
+    retention.add_argument("--dry-run", action="store_true")
+
+    gc = commands.add_parser("gc", help="delete files and cold entries without metadata")
+    gc.add_argument("--min-age", type=float, default=3600,
+                    help="keep files younger than this many seconds (uploads in flight)")
+    gc.add_argument("--dry-run", action="store_true")
+    gc.add_argument("--force", action="store_true",
+                    help="run even if the scan metadata is empty")
+
+    args = parser.parse_args()
+    try:
+        run(parser, args)
+    except MetadataError as e:
+        parser.exit(1, f"Aborted, nothing was changed: {e}\n")
+
+
+def run(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    verb = "Would move" if args.dry_run else "Moved"
+
+    if args.command == "migrate":
+        print(f"{verb} {migrate_flat_layout(dry_run=args.dry_run)} scans into the sharded layout")
+    elif args.command == "retention":
+        if args.days <= 0:
+            parser.error("set --days or RETENTION_DAYS to a positive number")
+        print(f"{verb} {apply_retention(args.days, dry_run=args.dry_run)} scans to the cold tier")
+    elif args.command == "gc":
+        verb = "Would remove" if args.dry_run else "Removed"
+        # both check metadata / index before deleting anything
+        entries = collect_cold_orphans(min_age_seconds=args.min_age, dry_run=args.dry_run, force=args.force)
+        removed = collect_orphans(min_age_seconds=args.min_age, dry_run=args.dry_run, force=args.force)
+        for path in removed:
+            print(f"  {path}")
+        sessions = collect_stale_sessions(settings.UPLOAD_SESSION_TTL_HOURS, dry_run=args.dry_run)
+        profiles = prune_profiles(settings.PROFILE_RETENTION_HOURS, settings.PROFILE_MAX_COUNT,
+                                  dry_run=args.dry_run)
+        print(f"{verb} {len(removed)} orphaned files, {entries} orphaned cold entries, "
+              f"{sessions} stale upload sessions and {profiles} old profiles")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@ from typing import List, Dict
 from app.models.analysis import AnalysisArea
 
 
+# Bump whenever thresholds or wording change (invalidates cached analyses)
+RULES_VERSION = 1
+
+
 def build_recommendations(measurements: Dict[str, float]) -> List[AnalysisArea]:
     """
     Very simple rule-based engine.
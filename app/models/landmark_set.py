@@ -0,0 +1,119 @@
+"""
+Compact array-backed landmark container used across the analysis pipeline.
+
+Landmarks are stored as one contiguous (K, 3) float array. Named landmarks
+(the ones produced by the geometric extractor) live at fixed rows given by
+LANDMARK_INDEX; rows for landmarks that were not detected are NaN.
+Anonymous landmark streams (e.g. raw MediaPipe points from iOS) keep their
+own order and have no schema.
+
+Conversion to / from the pydantic API models only happens at the edges.
+"""
+from typing import Dict, List, Mapping, Optional, Sequence
+import numpy as np
+from app.models.landmarks import Landmark
+
+
+# Fixed landmark schema: name → row in LandmarkSet.points
+LANDMARK_NAMES = (
+    "nose_tip",
+    "chin",
+    "forehead_center",
+    "left_eye_outer",
+    "left_eye_inner",
+    "right_eye_outer",
+    "right_eye_inner",
+    "mouth_left",
+    "mouth_right",
+    "mouth_center",
+)
+LANDMARK_INDEX: Dict[str, int] = {name: i for i, name in enumerate(LANDMARK_NAMES)}
+
+
+class LandmarkSet:
+    """
+    (K, 3) landmark coordinates plus an optional name → row schema.
+
+    `get()` returns zero-copy row views into `points`, so callers must not
+    mutate them.
+    """
+    __slots__ = ("points", "schema")
+
+    def __init__(self, points: np.ndarray, schema: Optional[Mapping[str, int]] = LANDMARK_INDEX):
+        self.points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3)
+        self.schema = schema
+
+    @classmethod
+    def empty(cls) -> "LandmarkSet":
+        """Named set with every landmark missing."""
+        return cls(np.full((len(LANDMARK_NAMES), 3), np.nan))
+
+    @classmethod
+    def from_models(cls, landmarks: Sequence[Landmark]) -> "LandmarkSet":
+        """
+        Build from API models.
+        If any landmark carries a known name the result uses the fixed schema
+        (unnamed points are dropped), otherwise the points are kept as-is.
+        """
+        named = [lm for lm in landmarks if lm.name in LANDMARK_INDEX]
+        if named:
+            result = cls.empty()
+            for lm in named:
+                result.points[LANDMARK_INDEX[lm.name]] = (lm.x, lm.y, lm.z if lm.z is not None else 0.0)
+            return result
+
+        points = np.array(
+            [(lm.x, lm.y, lm.z if lm.z is not None else 0.0) for lm in landmarks],
+            dtype=np.float64,
+        )
+        return cls(points, schema=None)
+
+    def __len__(self) -> int:
+        """Number of landmarks actually present."""
+        return int(np.count_nonzero(~np.isnan(self.points[:, 0])))
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def get(self, name: str) -> Optional[np.ndarray]:
+        """Row view for a named landmark, or None if unknown / not detected."""
+        if self.schema is None:
+            return None
+        idx = self.schema.get(name)
+        if idx is None or idx >= len(self.points):
+            return None
+        point = self.points[idx]
+        if np.isnan(point[0]):
+            return None
+        return point
+
+    def distance(self, a: str, b: str) -> Optional[float]:
+        """Euclidean distance between two named landmarks, if both are present."""
+        pa = self.get(a)
+        pb = self.get(b)
+        if pa is None or pb is None:
+            return None
+        return float(np.linalg.norm(pa - pb))
+
+    def names(self) -> List[Optional[str]]:
+        """Name for each row of `points` (None for anonymous sets)."""
+        if self.schema is None:
+            return [None] * len(self.points)
+        by_index = {idx: name for name, idx in self.schema.items()}
+        return [by_index.get(i) for i in range(len(self.points))]
+
+    def to_dicts(self) -> List[Dict[str, float]]:
+        """Present landmarks as {x, y, z[, name]} dicts (for JSON / debugging)."""
+        result = []
+        for name, point in zip(self.names(), self.points):
+            if np.isnan(point[0]):
+                continue
+            item = {"x": float(point[0]), "y": float(point[1]), "z": float(point[2])}
+            if name is not None:
+                item["name"] = name
+            result.append(item)
+        return result
+
+    def to_models(self) -> List[Landmark]:
+        """Present landmarks as API models."""
+        return [Landmark(**item) for item in self.to_dicts()]
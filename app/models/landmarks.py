@@ -6,6 +6,8 @@ class Landmark(BaseModel):
     x: float
     y: float
     z: Optional[float] = None
+    # optional landmark name, e.g. "nose_tip" (see app.models.landmark_set)
+    name: Optional[str] = None
 
 
 class LandmarkRequest(BaseModel):
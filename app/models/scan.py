@@ -13,6 +13,7 @@ class ScanMetadata(BaseModel):
     analysis_id: Optional[str] = None  # Link to analysis result
     device: Optional[str] = None  # e.g., "iPhone 14 Pro"
     format: str  # "usdz", "obj", "glb", etc.
+    storage_tier: str = "hot"  # "hot" (file under UPLOAD_DIR) or "cold" (packed archive)
 
 
 class ScanListResponse(BaseModel):
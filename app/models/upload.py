@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class UploadSessionCreate(BaseModel):
+    """Start a resumable upload."""
+    filename: str
+    size: int  # total file size in bytes
+    device: Optional[str] = None
+    sha256: Optional[str] = None  # optional whole-file checksum, verified on finalize
+
+
+class UploadSessionStatus(BaseModel):
+    """Progress of a resumable upload."""
+    upload_id: str
+    filename: str
+    size: int
+    chunk_size: int
+    total_chunks: int
+    received: List[List[int]]  # merged [start, end) byte ranges already stored
+    missing_chunks: List[int]
+    complete: bool
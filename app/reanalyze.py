@@ -0,0 +1,186 @@
+"""
+Bulk re-analysis of every stored scan.
+
+Run after changing the rules thresholds or the landmark extractor:
+
+    python -m app.reanalyze --workers 8 --chunk-size 16
+
+Scans are split into chunks and fanned out over a process pool. Results are
+written back in bulk (one metadata + one results write per batch of finished
+chunks) and progress is checkpointed, so an interrupted run picks up where
+it stopped. Pass --restart to ignore an existing checkpoint.
+
+Scans in the cold tier are copied out of their pack into a temporary file
+for the duration of their analysis.
+
+Safe to run next to the live API: writes go through scan_manager's file lock,
+and workers lower their CPU priority (--nice, default 10) so the API's
+interactive requests are scheduled first.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.models.analysis import AnalysisResult
+from app.services.cold_storage import cold_scan_file, load_index
+from app.services.scan_manager import (
+    load_metadata,
+    metadata_lock,
+    save_analysis_results,
+    update_analysis_ids,
+)
+from app.services.storage import analyze_scan_file
+
+
+# one finished scan ID per line, appended after every flush
+CHECKPOINT_FILE = os.path.join(settings.UPLOAD_DIR, "reanalysis_checkpoint.log")
+
+
+def analyze_chunk(chunk: List[Tuple[str, str, Optional[dict]]]) -> List[Tuple[str, dict]]:
+    """
+    Worker: re-analyze (scan_id, file_path, cold index entry or None) triples.
+    Results go back as dicts so they pickle cheaply.
+    """
+    results = []
+    for scan_id, file_path, cold_entry in chunk:
+        if cold_entry is not None:
+            with cold_scan_file(cold_entry, file_path) as temp_path:
+                results.append((scan_id, analyze_scan_file(temp_path).dict()))
+            continue
+        if not os.path.exists(file_path):
+            print(f"Warning: scan file missing for {scan_id}: {file_path}")
+            continue
+        results.append((scan_id, analyze_scan_file(file_path).dict()))
+    return results
+
+
+def lower_priority(increment: int) -> None:
+    """Pool initializer: make worker processes yield the CPU to the API."""
+    if increment > 0 and hasattr(os, "nice"):
+        os.nice(increment)
+
+
+def load_checkpoint() -> Set[str]:
+    """Scan IDs already re-analyzed by an interrupted run."""
+    if not os.path.exists(CHECKPOINT_FILE):
+        return set()
+    try:
+        with open(CHECKPOINT_FILE, "r") as f:
+            return {line.strip() for line in f if line.strip()}
+    except Exception as e:
+        print(f"Error loading checkpoint: {e}")
+        return set()
+
+
+def append_checkpoint(scan_ids: Iterable[str]) -> None:
+    """
+    Record a finished batch. Appending keeps each flush proportional to the
+    batch, not to everything done so far.
+    """
+    with open(CHECKPOINT_FILE, "a") as f:
+        f.write("".join(f"{scan_id}\n" for scan_id in scan_ids))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def flush(pending: Dict[str, AnalysisResult], done: Set[str]) -> None:
+    """Write a batch of results, then record them in the checkpoint."""
+    if not pending:
+        return
+    # The API may be ingesting scans meanwhile: both files are re-read and
+    # written under the shared lock, so its writes are never overwritten.
+    with metadata_lock():
+        save_analysis_results(pending)
+        update_analysis_ids({scan_id: result.id for scan_id, result in pending.items()})
+    # Checkpoint last: a crash before this line only redoes this batch
+    append_checkpoint(pending)
+    done.update(pending)
+    pending.clear()
+
+
+def reanalyze_all(
+    workers: int,
+    chunk_size: int,
+    flush_every: int,
+    restart: bool = False,
+    nice: int = 10,
+) -> int:
+    """
+    Re-analyze every scan in the metadata store. Returns the number processed.
+    """
+    if restart and os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+
+    done = load_checkpoint()
+    scans = load_metadata()
+    index = load_index()
+    todo = []
+    for scan in scans:
+        if scan.id in done:
+            continue
+        cold_entry = index.get(scan.id) if scan.storage_tier == "cold" else None
+        if scan.storage_tier == "cold" and cold_entry is None:
+            print(f"Warning: cold scan {scan.id} has no index entry")
+            continue
+        todo.append((scan.id, scan.file_path, cold_entry))
+    if done:
+        print(f"Resuming: {len(done)} scans already done, {len(todo)} remaining")
+    if not todo:
+        print("Nothing to do")
+        return 0
+
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    pending: Dict[str, AnalysisResult] = {}
+    processed = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=lower_priority, initargs=(nice,)) as pool:
+        futures = [pool.submit(analyze_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            chunk_results = future.result()
+            for scan_id, data in chunk_results:
+                pending[scan_id] = AnalysisResult(**data)
+            processed += len(chunk_results)
+
+            if len(pending) >= flush_every:
+                flush(pending, done)
+                elapsed = time.perf_counter() - started
+                print(f"{processed}/{len(todo)} scans, {processed / elapsed:.1f} scans/sec")
+
+    flush(pending, done)
+    elapsed = time.perf_counter() - started
+    print(f"Done: {processed} scans in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.1f} scans/sec)")
+
+    # Finished cleanly, next run starts from scratch
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+    return processed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-run analysis over all stored scans.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=16,
+                        help="scans per work unit sent to a worker")
+    parser.add_argument("--flush-every", type=int, default=256,
+                        help="results buffered before a bulk write + checkpoint")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore an existing checkpoint and redo every scan")
+    parser.add_argument("--nice", type=int, default=10,
+                        help="CPU priority decrease for workers (0 = same as the API)")
+    args = parser.parse_args()
+
+    reanalyze_all(
+        workers=max(1, args.workers),
+        chunk_size=max(1, args.chunk_size),
+        flush_every=max(1, args.flush_every),
+        restart=args.restart,
+        nice=max(0, args.nice),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Admission control between interactive and bulk traffic.
+
+Requests are sorted into priority classes:
+
+    interactive   live landmark analysis (a clinician is waiting)
+    upload        analysis of uploaded scans (/analyze-scan, /analysis/scan,
+                  /uploads/{id}/finalize), not the body transfer itself
+    batch         preview builds (on demand and after ingest), and anything
+                  the client marks with `X-Priority: batch`
+
+Each class has its own concurrency limit and wait queue, so a burst of scan
+uploads can only ever occupy the upload slots and never queues in front of
+interactive calls. When a class's queue is full, new requests are shed
+immediately (503) instead of piling up latency. On top of that every device
+(X-Device header, else client address) gets a token bucket per class (429).
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Tuple
+from app.core.config import settings
+
+
+INTERACTIVE = "interactive"
+UPLOAD = "upload"
+BATCH = "batch"
+
+# buckets idle this long are dropped when the table grows large
+_BUCKET_IDLE_SECONDS = 600
+_MAX_BUCKETS = 10000
+
+
+class AdmissionRejected(Exception):
+    """Request refused: 429 (rate limited) or 503 (class queue full)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass
+class PriorityClass:
+    name: str
+    max_concurrency: int
+    max_queue: int
+    rate: float  # requests / second per device
+    burst: float
+    active: int = 0
+    waiting: int = 0
+    admitted: int = 0
+    shed: int = 0
+    rate_limited: int = 0
+    semaphore: asyncio.Semaphore = field(init=False)
+
+    def __post_init__(self):
+        self.semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float):
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, rate: float, capacity: float) -> float:
+        """Consume one token. Returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate if rate > 0 else 60.0
+
+
+class AdmissionController:
+    def __init__(self, classes: Dict[str, PriorityClass]):
+        self.classes = classes
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def _check_rate(self, cls: PriorityClass, device: str) -> None:
+        if cls.rate <= 0:
+            return
+        key = (cls.name, device)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= _MAX_BUCKETS:
+                self._prune_buckets()
+            bucket = self._buckets[key] = TokenBucket(cls.burst)
+        wait = bucket.take(cls.rate, cls.burst)
+        if wait > 0:
+            cls.rate_limited += 1
+            raise AdmissionRejected(429, "Too many requests from this device", wait)
+
+    def _prune_buckets(self) -> None:
+        cutoff = time.monotonic() - _BUCKET_IDLE_SECONDS
+        for key in [key for key, bucket in self._buckets.items() if bucket.updated < cutoff]:
+            del self._buckets[key]
+
+    @asynccontextmanager
+    async def admit(self, class_name: str, device: str) -> AsyncIterator[None]:
+        """Hold a slot of `class_name` for the duration of the block."""
+        cls = self.classes[class_name]
+        self._check_rate(cls, device)
+
+        if cls.active >= cls.max_concurrency and cls.waiting >= cls.max_queue:
+            cls.shed += 1
+            raise AdmissionRejected(503, f"Server busy ({cls.name} queue full)", 1.0)
+
+        cls.waiting += 1
+        try:
+            await cls.semaphore.acquire()
+        finally:
+            cls.waiting -= 1
+        cls.active += 1
+        cls.admitted += 1
+        try:
+            yield
+        finally:
+            cls.active -= 1
+            cls.semaphore.release()
+
+    @asynccontextmanager
+    async def hold(self, class_name: str) -> AsyncIterator[None]:
+        """
+        Wait for a slot of `class_name` for server-internal work (e.g.
+        background preview builds): no rate limit, never shed, and not
+        counted in the queue that sheds client requests.
+        """
+        cls = self.classes[class_name]
+        await cls.semaphore.acquire()
+        cls.active += 1
+        cls.admitted += 1
+        try:
+            yield
+        finally:
+            cls.active -= 1
+            cls.semaphore.release()
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "active": cls.active,
+                "waiting": cls.waiting,
+                "max_concurrency": cls.max_concurrency,
+                "max_queue": cls.max_queue,
+                "admitted": cls.admitted,
+                "shed": cls.shed,
+                "rate_limited": cls.rate_limited,
+            }
+            for name, cls in self.classes.items()
+        }
+
+
+def build_controller() -> AdmissionController:
+    return AdmissionController({
+        INTERACTIVE: PriorityClass(
+            INTERACTIVE,
+            settings.ADMISSION_INTERACTIVE_CONCURRENCY,
+            settings.ADMISSION_INTERACTIVE_QUEUE,
+            settings.ADMISSION_INTERACTIVE_RATE,
+            settings.ADMISSION_INTERACTIVE_BURST,
+        ),
+        UPLOAD: PriorityClass(
+            UPLOAD,
+            settings.ADMISSION_UPLOAD_CONCURRENCY,
+            settings.ADMISSION_UPLOAD_QUEUE,
+            settings.ADMISSION_UPLOAD_RATE,
+            settings.ADMISSION_UPLOAD_BURST,
+        ),
+        BATCH: PriorityClass(
+            BATCH,
+            settings.ADMISSION_BATCH_CONCURRENCY,
+            settings.ADMISSION_BATCH_QUEUE,
+            settings.ADMISSION_BATCH_RATE,
+            settings.ADMISSION_BATCH_BURST,
+        ),
+    })
+
+
+admission = build_controller()
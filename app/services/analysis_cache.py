@@ -0,0 +1,109 @@
+"""
+LRU + TTL memoization of landmark analysis.
+
+Clients often resubmit the same (or nearly the same) landmarks — retries,
+UI re-renders. Landmarks are quantized to ANALYSIS_CACHE_TOLERANCE and
+hashed together with the rules-engine version, so such resubmissions get the
+previous AnalysisResult back without re-running the pipeline.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.ml.rules_engine import RULES_VERSION
+from app.models.analysis import AnalysisResult
+from app.models.landmark_set import LandmarkSet
+from app.services.facial_analysis import analyze_landmarks
+
+
+def landmark_cache_key(landmarks: LandmarkSet, tolerance: float) -> str:
+    """
+    Hash of the landmarks snapped to a `tolerance` grid (+ rules version).
+    Points closer than `tolerance` usually share a key, but may not when
+    they straddle a grid boundary. A tolerance <= 0 hashes exact coordinates.
+    """
+    points = np.asarray(landmarks.points, dtype=np.float64)
+    if tolerance > 0:
+        points = np.round(points / tolerance)
+    # Kept as floats (no int cast that could overflow); "+ 0.0" folds -0.0
+    # into 0.0 and every missing landmark gets the same NaN bit pattern.
+    quantized = np.where(np.isnan(points), np.nan, points + 0.0)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        f"rules={RULES_VERSION};named={landmarks.schema is not None};tolerance={max(tolerance, 0)!r};".encode()
+    )
+    digest.update(quantized.tobytes())
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Size-bounded LRU with per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, AnalysisResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[AnalysisResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, result: AnalysisResult) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+analysis_cache = AnalysisCache(settings.ANALYSIS_CACHE_SIZE, settings.ANALYSIS_CACHE_TTL)
+
+
+def analyze_landmarks_cached(landmarks: LandmarkSet) -> AnalysisResult:
+    """
+    analyze_landmarks() behind analysis_cache.
+    Returns a deep copy so callers may change fields (e.g. id, areas) freely
+    without touching the cached entry.
+    """
+    key = landmark_cache_key(landmarks, settings.ANALYSIS_CACHE_TOLERANCE)
+    result = analysis_cache.get(key)
+    if result is None:
+        result = analyze_landmarks(landmarks)
+        analysis_cache.put(key, result)
+    return result.copy(deep=True)
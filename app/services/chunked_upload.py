@@ -0,0 +1,250 @@
+"""
+Resumable chunked uploads.
+
+A session lives in UPLOAD_DIR/incoming/<upload_id>/:
+
+    session.json      filename, size, chunk_size, device, sha256
+    data.part         the file being assembled (chunks written at their offset)
+    <index>.chunk     one small JSON record per stored chunk (offset, size, sha256)
+
+Chunk i always covers bytes [i * chunk_size, min((i + 1) * chunk_size, size)).
+One record file per chunk (instead of rewriting session.json) means
+concurrent or retransmitted chunk PUTs never race on shared state.
+On finalize the session directory is first renamed to <upload_id>.finalizing
+(an atomic claim, so only one of several concurrent finalize calls proceeds),
+then the assembled file is moved into the scan store and goes through the
+normal ingest pipeline.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import List, Optional, Tuple
+from fastapi import BackgroundTasks
+from app.core.config import settings
+from app.models.analysis import AnalysisResult
+from app.models.upload import UploadSessionCreate, UploadSessionStatus
+from app.services.scan_layout import INCOMING_DIR_NAME, scan_file_path
+from app.services.scan_manager import write_json_atomic
+from app.services.storage import ingest_scan_file
+
+
+INCOMING_DIR = os.path.join(settings.UPLOAD_DIR, INCOMING_DIR_NAME)
+CLAIMED_SUFFIX = ".finalizing"
+
+
+class UploadTooLarge(ValueError):
+    """Announced size is above MAX_UPLOAD_SIZE."""
+
+
+class UploadConflict(ValueError):
+    """The session is already being finalized by another request."""
+
+
+def _session_dir(upload_id: str) -> str:
+    # upload IDs are server-generated UUIDs; reject anything else (path traversal)
+    return os.path.join(INCOMING_DIR, str(uuid.UUID(upload_id)))
+
+
+def _load_session(upload_id: str) -> Optional[dict]:
+    try:
+        path = os.path.join(_session_dir(upload_id), "session.json")
+    except ValueError:
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _total_chunks(session: dict) -> int:
+    return max(1, -(-session["size"] // session["chunk_size"]))
+
+
+def create_session(request: UploadSessionCreate) -> UploadSessionStatus:
+    if request.size <= 0:
+        raise ValueError("size must be positive")
+    if request.size > settings.MAX_UPLOAD_SIZE:
+        raise UploadTooLarge(f"size must be at most {settings.MAX_UPLOAD_SIZE} bytes")
+
+    upload_id = str(uuid.uuid4())
+    session_dir = _session_dir(upload_id)
+    os.makedirs(session_dir)
+    session = {
+        "upload_id": upload_id,
+        "filename": request.filename,
+        "size": request.size,
+        "chunk_size": settings.UPLOAD_CHUNK_SIZE,
+        "device": request.device,
+        "sha256": request.sha256,
+    }
+    # Preallocate so chunks can be written at any offset, in any order
+    with open(os.path.join(session_dir, "data.part"), "wb") as f:
+        f.truncate(request.size)
+    write_json_atomic(os.path.join(session_dir, "session.json"), session)
+    return _status(session)
+
+
+def get_status(upload_id: str) -> Optional[UploadSessionStatus]:
+    session = _load_session(upload_id)
+    try:
+        return _status(session) if session else None
+    except FileNotFoundError:  # claimed by finalize meanwhile
+        return None
+
+
+def get_chunk_size(upload_id: str) -> Optional[int]:
+    """Largest chunk body the session accepts, or None for unknown sessions."""
+    session = _load_session(upload_id)
+    return session["chunk_size"] if session else None
+
+
+def _received_chunks(session_dir: str) -> List[int]:
+    return sorted(
+        int(name.split(".")[0]) for name in os.listdir(session_dir) if name.endswith(".chunk")
+    )
+
+
+def _status(session: dict, session_dir: Optional[str] = None) -> UploadSessionStatus:
+    chunk_size = session["chunk_size"]
+    total = _total_chunks(session)
+    received = _received_chunks(session_dir or _session_dir(session["upload_id"]))
+
+    ranges: List[List[int]] = []
+    for index in received:
+        start = index * chunk_size
+        end = min(start + chunk_size, session["size"])
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+
+    have = set(received)
+    missing = [index for index in range(total) if index not in have]
+    return UploadSessionStatus(
+        upload_id=session["upload_id"],
+        filename=session["filename"],
+        size=session["size"],
+        chunk_size=chunk_size,
+        total_chunks=total,
+        received=ranges,
+        missing_chunks=missing,
+        complete=not missing,
+    )
+
+
+def write_chunk(upload_id: str, index: int, offset: int, data: bytes, sha256: str) -> Optional[UploadSessionStatus]:
+    """
+    Store one chunk after checking its position and checksum.
+    Re-sending a chunk simply overwrites it. Returns None for unknown sessions.
+    """
+    session = _load_session(upload_id)
+    if session is None:
+        return None
+
+    chunk_size = session["chunk_size"]
+    if not 0 <= index < _total_chunks(session):
+        raise ValueError(f"chunk index out of range (0..{_total_chunks(session) - 1})")
+    if offset != index * chunk_size:
+        raise ValueError(f"chunk {index} must start at offset {index * chunk_size}")
+    expected_size = min(chunk_size, session["size"] - offset)
+    if len(data) != expected_size:
+        raise ValueError(f"chunk {index} must be {expected_size} bytes, got {len(data)}")
+    digest = hashlib.sha256(data).hexdigest()
+    if digest != sha256.lower():
+        raise ValueError("chunk checksum mismatch")
+
+    session_dir = _session_dir(upload_id)
+    try:
+        with open(os.path.join(session_dir, "data.part"), "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # Record last, so a chunk only counts once its bytes are on disk
+        write_json_atomic(
+            os.path.join(session_dir, f"{index}.chunk"),
+            {"offset": offset, "size": len(data), "sha256": digest},
+        )
+        return _status(session)
+    except FileNotFoundError:
+        # finalized (or garbage-collected) in the meantime
+        return None
+
+
+def finalize(
+    upload_id: str,
+    background_tasks: Optional[BackgroundTasks] = None
+) -> Optional[Tuple[AnalysisResult, str]]:
+    """
+    Move a complete upload into the scan store and run the ingest pipeline.
+    Returns (AnalysisResult, scan_id), or None for unknown sessions. Raises
+    UploadConflict if another request is already finalizing this session.
+    """
+    session = _load_session(upload_id)
+    if session is None:
+        return None
+
+    # Claim the session: rename is atomic, so exactly one caller wins
+    session_dir = _session_dir(upload_id)
+    claimed_dir = session_dir + CLAIMED_SUFFIX
+    try:
+        os.rename(session_dir, claimed_dir)
+    except FileNotFoundError:
+        raise UploadConflict("upload is already being finalized")
+
+    part_path = os.path.join(claimed_dir, "data.part")
+    try:
+        status = _status(session, claimed_dir)
+        if not status.complete:
+            raise ValueError(f"missing chunks: {status.missing_chunks}")
+        if session.get("sha256"):
+            digest = hashlib.sha256()
+            with open(part_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            if digest.hexdigest() != session["sha256"].lower():
+                raise ValueError("file checksum mismatch")
+    except ValueError:
+        os.rename(claimed_dir, session_dir)  # release, so missing chunks can be (re-)sent
+        raise
+
+    scan_id = str(uuid.uuid4())
+    filename = session["filename"]
+    ext = filename.split(".")[-1] if "." in filename else "usdz"
+    dest_path = scan_file_path(scan_id, ext)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    os.replace(part_path, dest_path)
+    shutil.rmtree(claimed_dir, ignore_errors=True)
+
+    result = ingest_scan_file(
+        scan_id, dest_path, filename, device=session.get("device"), background_tasks=background_tasks
+    )
+    return result, scan_id
+
+
+def collect_stale_sessions(max_age_hours: float, dry_run: bool = False) -> int:
+    """Delete upload sessions untouched for `max_age_hours`. Returns how many."""
+    if not os.path.isdir(INCOMING_DIR):
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for name in os.listdir(INCOMING_DIR):
+        session_dir = os.path.join(INCOMING_DIR, name)
+        try:
+            newest = max(
+                [os.path.getmtime(session_dir)]
+                + [os.path.getmtime(os.path.join(session_dir, f)) for f in os.listdir(session_dir)]
+            )
+        except FileNotFoundError:
+            # claimed / finalized (or a chunk record replaced) while scanning
+            continue
+        if newest > cutoff:
+            continue
+        if not dry_run:
+            shutil.rmtree(session_dir, ignore_errors=True)
+        removed += 1
+    return removed
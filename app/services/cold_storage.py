@@ -0,0 +1,159 @@
+"""
+Cold tier for old scans.
+
+Scans past the retention window are appended back-to-back into pack files
+under UPLOAD_DIR/cold/, with an index recording where each one lives:
+
+    cold/pack-20250115T103000.pack
+    cold/index.json   {scan_id: {"pack": ..., "offset": ..., "size": ...}}
+
+One pack per retention run replaces thousands of small files, which keeps
+directory scans and backups cheap. Reads seek straight to the offset.
+"""
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional
+from app.core.config import settings
+from app.services.scan_layout import COLD_DIR_NAME, is_preview_file, related_files
+from app.services.scan_manager import MetadataError, load_metadata, metadata_lock, update_scans, write_json_atomic
+
+
+COLD_DIR = os.path.join(settings.UPLOAD_DIR, COLD_DIR_NAME)
+INDEX_FILE = os.path.join(COLD_DIR, "index.json")
+
+
+def load_index(strict: bool = False) -> Dict[str, dict]:
+    """
+    scan_id → {"pack", "offset", "size"} for every cold scan. An unreadable
+    index counts as empty, unless `strict`: then it raises MetadataError.
+    """
+    if not os.path.exists(INDEX_FILE):
+        return {}
+
+    try:
+        with open(INDEX_FILE, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        if strict:
+            raise MetadataError(f"Can't read {INDEX_FILE}: {e}") from e
+        print(f"Error loading cold index: {e}")
+        return {}
+
+
+def get_cold_entry(scan_id: str) -> Optional[dict]:
+    return load_index().get(scan_id)
+
+
+def iter_cold_scan(entry: dict, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    """Stream one scan's bytes out of its pack file."""
+    with open(os.path.join(COLD_DIR, entry["pack"]), "rb") as f:
+        f.seek(entry["offset"])
+        remaining = entry["size"]
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@contextmanager
+def cold_scan_file(entry: dict, filename: str) -> Iterator[str]:
+    """
+    Copy a cold scan out of its pack into a temporary file named `filename`
+    (keep the extension: extraction dispatches on it). Removed on exit.
+    """
+    with tempfile.TemporaryDirectory(prefix="cold-scan-") as temp_dir:
+        path = os.path.join(temp_dir, os.path.basename(filename))
+        with open(path, "wb") as f:
+            for chunk in iter_cold_scan(entry):
+                f.write(chunk)
+        yield path
+
+
+def apply_retention(days: int, dry_run: bool = False) -> int:
+    """
+    Pack every hot scan uploaded more than `days` days ago into a new pack
+    file, then delete the hot copies. Returns the number of scans moved.
+
+    Order matters for crash safety: pack (fsynced) → index → metadata →
+    delete hot files. Until the last step both copies exist, and downloads
+    fall back to the cold tier whenever the hot file is gone. Preview GLBs
+    are small and stay in place so the dashboard can still browse.
+
+    Raises MetadataError (changing nothing) if the metadata or the cold
+    index is unreadable.
+    """
+    cutoff = datetime.now() - timedelta(days=days)
+    load_index(strict=True)  # fail before packing anything
+    candidates = [
+        scan for scan in load_metadata(strict=True)
+        if scan.storage_tier == "hot" and scan.uploaded_at < cutoff and os.path.exists(scan.file_path)
+    ]
+    if dry_run or not candidates:
+        return len(candidates)
+
+    os.makedirs(COLD_DIR, exist_ok=True)
+    pack_name = f"pack-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.pack"
+    entries: Dict[str, dict] = {}
+    offset = 0
+    with open(os.path.join(COLD_DIR, pack_name), "wb") as pack:
+        for scan in candidates:
+            with open(scan.file_path, "rb") as f:
+                size = 0
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    pack.write(chunk)
+                    size += len(chunk)
+            entries[scan.id] = {"pack": pack_name, "offset": offset, "size": size}
+            offset += size
+        pack.flush()
+        os.fsync(pack.fileno())
+
+    with metadata_lock():
+        index = load_index(strict=True)
+        index.update(entries)
+        write_json_atomic(INDEX_FILE, index)
+        update_scans({scan.id: {"storage_tier": "cold"} for scan in candidates})
+
+    for scan in candidates:
+        for path in related_files(scan.file_path):
+            if not is_preview_file(path):
+                os.remove(path)
+    return len(candidates)
+
+
+def collect_cold_orphans(min_age_seconds: float = 3600, dry_run: bool = False, force: bool = False) -> int:
+    """
+    Drop index entries for scans that no longer have metadata and delete
+    packs no entry points into anymore (skipping packs younger than
+    `min_age_seconds`, which may still be being written).
+    Returns the number of entries dropped.
+
+    Raises MetadataError (deleting nothing) if the metadata or index is
+    unreadable, or if the metadata is empty while the index isn't, unless `force`.
+    """
+    with metadata_lock():
+        known = {scan.id for scan in load_metadata(strict=True)}
+        index = load_index(strict=True)
+        if not known and index and not force:
+            raise MetadataError("scan metadata is empty but the cold index is not")
+        orphans = [scan_id for scan_id in index if scan_id not in known]
+        if dry_run or not os.path.isdir(COLD_DIR):
+            return len(orphans)
+
+        for scan_id in orphans:
+            del index[scan_id]
+        if orphans:
+            write_json_atomic(INDEX_FILE, index)
+
+    live_packs = {entry["pack"] for entry in index.values()}
+    cutoff = time.time() - min_age_seconds
+    for name in os.listdir(COLD_DIR):
+        path = os.path.join(COLD_DIR, name)
+        if name.endswith(".pack") and name not in live_packs and os.path.getmtime(path) <= cutoff:
+            os.remove(path)
+    return len(orphans)
@@ -1,47 +1,49 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 import uuid
+import numpy as np
 from app.models.analysis import AnalysisResult, AnalysisArea
+from app.models.landmark_set import LandmarkSet
 from app.ml.rules_engine import build_recommendations
 from app.ml.aesthetic_embedder import get_aesthetic_embedding, rerank_by_embedding
 
 
+def _first_present(landmarks: LandmarkSet, *names: str) -> Optional[np.ndarray]:
+    for name in names:
+        point = landmarks.get(name)
+        if point is not None:
+            return point
+    return None
+
+
 # This maps raw landmarks → engineered measurements
-def compute_measurements_from_landmarks(landmarks: List[dict]) -> Dict[str, float]:
+def compute_measurements_from_landmarks(landmarks: LandmarkSet) -> Dict[str, float]:
     """
-    landmarks: list of {x,y,z} or {x,y,z,name}.
+    landmarks: LandmarkSet (named landmarks are looked up by schema row).
     Computes real facial measurements from extracted landmarks.
     """
-    import numpy as np
-    from app.services.landmark_extractor import get_landmark_by_name, compute_inter_pupillary_distance
+    from app.services.landmark_extractor import compute_inter_pupillary_distance
     
     measurements: Dict[str, float] = {}
     
-    if not landmarks or len(landmarks) == 0:
+    if landmarks is None or len(landmarks) == 0:
         # Fallback to placeholder if no landmarks
         measurements["nose_to_ipd_ratio"] = 0.52
         measurements["chin_projection_mm"] = 11.8
         measurements["jaw_asymmetry_mm"] = 5.3
         return measurements
     
-    # Convert landmarks to numpy arrays for easier computation
-    landmark_dict = {}
-    for lm in landmarks:
-        name = lm.get("name", "")
-        if name:
-            landmark_dict[name] = np.array([lm["x"], lm["y"], lm["z"]])
-    
     # 1. Compute Inter-Pupillary Distance (IPD)
     ipd = compute_inter_pupillary_distance(landmarks)
     if ipd is None:
         # Try to compute from eye landmarks
-        left_eye = landmark_dict.get("left_eye_outer") or landmark_dict.get("left_eye_inner")
-        right_eye = landmark_dict.get("right_eye_outer") or landmark_dict.get("right_eye_inner")
+        left_eye = _first_present(landmarks, "left_eye_outer", "left_eye_inner")
+        right_eye = _first_present(landmarks, "right_eye_outer", "right_eye_inner")
         if left_eye is not None and right_eye is not None:
             ipd = float(np.linalg.norm(left_eye - right_eye))
     
     # 2. Compute nose width (alar base width)
     # Use mouth corners or estimate from nose region
-    nose_tip = landmark_dict.get("nose_tip")
+    nose_tip = landmarks.get("nose_tip")
     if nose_tip is not None and ipd is not None:
         # Estimate alar base width as a ratio of IPD
         # This is an approximation - ideally we'd have actual alar landmarks
@@ -51,7 +53,7 @@ def compute_measurements_from_landmarks(landmarks: List[dict]) -> Dict[str, floa
         measurements["nose_to_ipd_ratio"] = 0.52
     
     # 3. Compute chin projection
-    chin = landmark_dict.get("chin")
+    chin = landmarks.get("chin")
     if chin is not None and nose_tip is not None:
         # Projection relative to nose tip (forward distance)
         # Assuming face-forward orientation, Z is forward
@@ -63,8 +65,8 @@ def compute_measurements_from_landmarks(landmarks: List[dict]) -> Dict[str, floa
         measurements["chin_projection_mm"] = 11.8
     
     # 4. Compute jawline asymmetry
-    mouth_left = landmark_dict.get("mouth_left")
-    mouth_right = landmark_dict.get("mouth_right")
+    mouth_left = landmarks.get("mouth_left")
+    mouth_right = landmarks.get("mouth_right")
     if mouth_left is not None and mouth_right is not None:
         # Measure asymmetry in Y (vertical) and X (horizontal)
         vertical_asymmetry = abs(mouth_left[1] - mouth_right[1])
@@ -76,28 +78,27 @@ def compute_measurements_from_landmarks(landmarks: List[dict]) -> Dict[str, floa
         measurements["jaw_asymmetry_mm"] = 5.3
     
     # 5. Additional measurements (optional)
-    if chin is not None and landmark_dict.get("forehead_center") is not None:
-        forehead = landmark_dict["forehead_center"]
+    forehead = landmarks.get("forehead_center")
+    if chin is not None and forehead is not None:
         face_height = float(np.linalg.norm(forehead - chin))
         measurements["face_height_mm"] = face_height * 1000
     
     return measurements
 
 
-def analyze_landmarks(landmarks: List[dict]) -> AnalysisResult:
+def recommend_from_measurements(measurements: Dict[str, float]) -> List[AnalysisArea]:
     """
-    Core entry point for iOS.
+    Measurements → ordered recommendations.
     """
-    # 1) geometry-based
-    measurements = compute_measurements_from_landmarks(landmarks)
-
-    # 2) rule-based recommendations
+    # rule-based recommendations
     recs = build_recommendations(measurements)
 
-    # 3) optional: aesthetic embedding to reorder / prioritize
+    # optional: aesthetic embedding to reorder / prioritize
     embedding = get_aesthetic_embedding(None)  # we don't have image here yet
-    recs = rerank_by_embedding(recs, embedding)
+    return rerank_by_embedding(recs, embedding)
+
 
+def build_analysis_result(recs: List[AnalysisArea]) -> AnalysisResult:
     summary = f"We found {len(recs)} areas that can be harmonized."
     return AnalysisResult(
         id=str(uuid.uuid4()),
@@ -105,3 +106,15 @@ def analyze_landmarks(landmarks: List[dict]) -> AnalysisResult:
         areas=recs
     )
 
+
+def analyze_landmarks(landmarks: LandmarkSet) -> AnalysisResult:
+    """
+    Core entry point for iOS.
+    """
+    # 1) geometry-based
+    measurements = compute_measurements_from_landmarks(landmarks)
+
+    # 2) rules + 3) rerank
+    recs = recommend_from_measurements(measurements)
+
+    return build_analysis_result(recs)
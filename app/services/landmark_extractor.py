@@ -7,10 +7,13 @@ ARKit face meshes follow a known topology, which we leverage for landmark detect
 import os
 import zipfile
 import tempfile
-from typing import List, Dict, Optional, Tuple
+from typing import Optional
 import numpy as np
 import trimesh
-from scipy.spatial.distance import cdist
+from scipy.spatial import cKDTree
+from app.core.config import settings
+from app.models.landmark_set import LandmarkSet, LANDMARK_INDEX
+from app.services.vertex_cache import file_digest, load_cached_vertices, store_cached_vertices
 
 
 # ARKit face mesh topology constants
@@ -30,7 +33,15 @@ ARKIT_LANDMARK_REGIONS = {
 }
 
 
-def extract_landmarks_from_mesh(mesh_path: str) -> List[Dict[str, float]]:
+# Landmarks picked as single extreme vertices; refine_landmarks() replaces them
+# with a robust estimate over their local neighbourhood
+REFINED_LANDMARKS = ("nose_tip", "chin", "mouth_left", "mouth_right", "mouth_center")
+
+# Bump when vertex loading / normalization changes so cached vertex arrays are rebuilt
+EXTRACTOR_VERSION = 1
+
+
+def extract_landmarks_from_mesh(mesh_path: str) -> LandmarkSet:
     """
     Extract facial landmarks from a 3D mesh file.
     
@@ -38,21 +49,56 @@ def extract_landmarks_from_mesh(mesh_path: str) -> List[Dict[str, float]]:
         mesh_path: Path to 3D model file (USDZ, OBJ, or GLB)
         
     Returns:
-        List of landmark dictionaries with x, y, z coordinates
+        LandmarkSet with the detected landmarks
+    """
+    return detect_landmarks(get_normalized_vertices(mesh_path))
+
+
+def get_normalized_vertices(mesh_path: str) -> np.ndarray:
+    """
+    Normalized vertex array for a mesh file.
+    Served from the memory-mapped .npy sidecar when one matches the file
+    contents and EXTRACTOR_VERSION; otherwise the mesh is parsed and the
+    sidecar written for next time.
+    """
+    if not settings.VERTEX_CACHE:
+        return load_normalized_vertices(mesh_path)
+
+    digest = file_digest(mesh_path)
+    cached = load_cached_vertices(mesh_path, digest, EXTRACTOR_VERSION)
+    if cached is not None:
+        return cached
+
+    vertices = load_normalized_vertices(mesh_path)
+    if len(vertices) > 0:
+        try:
+            store_cached_vertices(mesh_path, digest, EXTRACTOR_VERSION, vertices)
+        except OSError as e:
+            print(f"Warning: could not write vertex cache for {mesh_path}: {e}")
+    return vertices
+
+
+def load_normalized_vertices(mesh_path: str) -> np.ndarray:
+    """
+    Parse a mesh file and return its centered vertices (Nx3, may be empty).
     """
     ext = os.path.splitext(mesh_path)[1].lower()
     
     if ext == ".usdz":
-        return extract_from_usdz(mesh_path)
+        vertices = load_usdz_vertices(mesh_path)
     elif ext in [".obj", ".glb", ".gltf"]:
-        return extract_from_mesh_file(mesh_path)
+        vertices = load_mesh_file_vertices(mesh_path)
     else:
         raise ValueError(f"Unsupported file format: {ext}")
 
+    if len(vertices) == 0:
+        return np.empty((0, 3), dtype=np.float64)
+    return normalize_vertices(np.asarray(vertices, dtype=np.float64))
+
 
-def extract_from_usdz(usdz_path: str) -> List[Dict[str, float]]:
+def load_usdz_vertices(usdz_path: str) -> np.ndarray:
     """
-    Extract mesh from USDZ file and get landmarks.
+    Extract mesh vertices from USDZ file.
     USDZ is a zip file containing USD (Universal Scene Description) files.
     """
     try:
@@ -67,11 +113,11 @@ def extract_from_usdz(usdz_path: str) -> List[Dict[str, float]]:
                     for file in files:
                         if file.endswith(('.obj', '.glb', '.gltf')):
                             mesh_file = os.path.join(root, file)
-                            return extract_from_mesh_file(mesh_file)
+                            return load_mesh_file_vertices(mesh_file)
                 
                 # If no OBJ/GLB found, try to load as USD (requires pxr library)
                 # For now, fall back to geometric detection
-                return extract_landmarks_geometric(load_mesh_vertices(usdz_path))
+                return load_mesh_vertices(usdz_path)
     except Exception as e:
         # Fallback: try to load as regular mesh
         try:
@@ -79,14 +125,14 @@ def extract_from_usdz(usdz_path: str) -> List[Dict[str, float]]:
             if isinstance(mesh, trimesh.Scene):
                 # Get the first mesh from the scene
                 mesh = list(mesh.geometry.values())[0]
-            return extract_landmarks_geometric(mesh.vertices)
+            return mesh.vertices
         except Exception:
             raise ValueError(f"Failed to parse USDZ file: {e}")
 
 
-def extract_from_mesh_file(mesh_path: str) -> List[Dict[str, float]]:
+def load_mesh_file_vertices(mesh_path: str) -> np.ndarray:
     """
-    Extract landmarks from OBJ, GLB, or GLTF file.
+    Load vertices from OBJ, GLB, or GLTF file.
     """
     try:
         mesh = trimesh.load(mesh_path)
@@ -102,7 +148,7 @@ def extract_from_mesh_file(mesh_path: str) -> List[Dict[str, float]]:
         if not hasattr(mesh, 'vertices') or mesh.vertices is None:
             raise ValueError("Mesh has no vertices")
         
-        return extract_landmarks_geometric(mesh.vertices)
+        return mesh.vertices
     except Exception as e:
         raise ValueError(f"Failed to parse mesh file {mesh_path}: {e}")
 
@@ -120,7 +166,7 @@ def load_mesh_vertices(file_path: str) -> np.ndarray:
         return np.array([])
 
 
-def extract_landmarks_geometric(vertices: np.ndarray) -> List[Dict[str, float]]:
+def extract_landmarks_geometric(vertices: np.ndarray) -> LandmarkSet:
     """
     Extract facial landmarks using geometric methods.
     
@@ -133,30 +179,43 @@ def extract_landmarks_geometric(vertices: np.ndarray) -> List[Dict[str, float]]:
         vertices: Nx3 numpy array of vertex coordinates
         
     Returns:
-        List of landmark dictionaries
+        LandmarkSet (rows for undetected landmarks stay NaN)
     """
     if len(vertices) == 0:
-        return []
+        return LandmarkSet.empty()
     
     # Normalize coordinates (center and scale)
-    vertices = normalize_vertices(vertices)
+    return detect_landmarks(normalize_vertices(np.asarray(vertices, dtype=np.float64)))
+
+
+def detect_landmarks(vertices: np.ndarray) -> LandmarkSet:
+    """
+    Geometric landmark detection on already-normalized vertices
+    (see extract_landmarks_geometric). Read-only input, so memory-mapped
+    arrays work without copying.
+    """
+    result = LandmarkSet.empty()
+    if len(vertices) == 0:
+        return result
     
-    landmarks = {}
+    # Write straight into the preallocated (K, 3) array, keyed by schema row
+    points = result.points
+    L = LANDMARK_INDEX
     
     # 1. Nose tip: most forward point (highest Z in face-forward orientation)
     # Assuming face is oriented with Z forward, Y up
     nose_tip_idx = np.argmax(vertices[:, 2])
-    landmarks["nose_tip"] = vertices[nose_tip_idx]
+    points[L["nose_tip"]] = vertices[nose_tip_idx]
     
     # 2. Chin: lowest point (minimum Y)
     chin_idx = np.argmin(vertices[:, 1])
-    landmarks["chin"] = vertices[chin_idx]
+    points[L["chin"]] = vertices[chin_idx]
     
     # 3. Forehead: highest point (maximum Y) in upper region
     upper_region = vertices[vertices[:, 1] > np.percentile(vertices[:, 1], 70)]
     if len(upper_region) > 0:
         forehead_idx = np.argmax(upper_region[:, 1])
-        landmarks["forehead_center"] = upper_region[forehead_idx]
+        points[L["forehead_center"]] = upper_region[forehead_idx]
     
     # 4. Eye regions: points in upper-middle region, left and right of center
     center_x = np.median(vertices[:, 0])
@@ -170,20 +229,20 @@ def extract_landmarks_geometric(vertices: np.ndarray) -> List[Dict[str, float]]:
     if len(left_region) > 0:
         # Left eye: most forward point in left region
         left_eye_idx = np.argmax(left_region[:, 2])
-        landmarks["left_eye_outer"] = left_region[left_eye_idx]
+        points[L["left_eye_outer"]] = left_region[left_eye_idx]
         
         # Left eye inner: closer to center
         left_inner = left_region[np.argmin(np.abs(left_region[:, 0] - center_x))]
-        landmarks["left_eye_inner"] = left_inner
+        points[L["left_eye_inner"]] = left_inner
     
     if len(right_region) > 0:
         # Right eye: most forward point in right region
         right_eye_idx = np.argmax(right_region[:, 2])
-        landmarks["right_eye_outer"] = right_region[right_eye_idx]
+        points[L["right_eye_outer"]] = right_region[right_eye_idx]
         
         # Right eye inner: closer to center
         right_inner = right_region[np.argmin(np.abs(right_region[:, 0] - center_x))]
-        landmarks["right_eye_inner"] = right_inner
+        points[L["right_eye_inner"]] = right_inner
     
     # 5. Mouth corners: points in lower-middle region
     mouth_region = vertices[(vertices[:, 1] < np.percentile(vertices[:, 1], 50)) &
@@ -194,27 +253,51 @@ def extract_landmarks_geometric(vertices: np.ndarray) -> List[Dict[str, float]]:
         right_mouth = mouth_region[mouth_region[:, 0] > center_x]
         
         if len(left_mouth) > 0:
-            landmarks["mouth_left"] = left_mouth[np.argmax(left_mouth[:, 2])]
+            points[L["mouth_left"]] = left_mouth[np.argmax(left_mouth[:, 2])]
         if len(right_mouth) > 0:
-            landmarks["mouth_right"] = right_mouth[np.argmax(right_mouth[:, 2])]
+            points[L["mouth_right"]] = right_mouth[np.argmax(right_mouth[:, 2])]
         
         # Mouth center: point closest to center X, in mouth region
         mouth_center_candidates = mouth_region[np.abs(mouth_region[:, 0] - center_x) < 
                                                np.std(mouth_region[:, 0]) * 0.5]
         if len(mouth_center_candidates) > 0:
-            landmarks["mouth_center"] = mouth_center_candidates[np.argmax(mouth_center_candidates[:, 2])]
+            points[L["mouth_center"]] = mouth_center_candidates[np.argmax(mouth_center_candidates[:, 2])]
+    
+    return refine_landmarks(vertices, result)
+
+
+def refine_landmarks(
+    vertices: np.ndarray,
+    landmarks: LandmarkSet,
+    tree: Optional[cKDTree] = None,
+    k: Optional[int] = None,
+    radius: Optional[float] = None,
+) -> LandmarkSet:
+    """
+    Replace each candidate in REFINED_LANDMARKS with the component-wise median
+    of its k nearest vertices (optionally only those within `radius`), so a
+    single noise spike can't decide the landmark.
+    
+    Uses one KD-tree per mesh (pass `tree` to reuse one) and a single batched
+    query: O(log N) per landmark and O(N) memory, unlike an all-pairs matrix.
+    Updates `landmarks` in place and returns it.
+    """
+    k = min(k or settings.LANDMARK_REFINE_K, len(vertices))
+    radius = radius or settings.LANDMARK_REFINE_RADIUS
+    rows = [LANDMARK_INDEX[name] for name in REFINED_LANDMARKS if name in landmarks]
+    if k <= 1 or not rows:
+        return landmarks
     
-    # Convert to list of dictionaries in expected format
-    landmark_list = []
-    for name, point in landmarks.items():
-        landmark_list.append({
-            "x": float(point[0]),
-            "y": float(point[1]),
-            "z": float(point[2]),
-            "name": name  # Optional: include name for debugging
-        })
+    if tree is None:
+        tree = cKDTree(vertices)
+    dist, idx = tree.query(landmarks.points[rows], k=k, distance_upper_bound=radius or np.inf)
     
-    return landmark_list
+    # Neighbours beyond the radius come back as inf / index N; mask them out.
+    # The candidate is its own nearest neighbour, so every row keeps one value.
+    neighbours = np.asarray(vertices)[np.minimum(idx, len(vertices) - 1)]
+    neighbours[~np.isfinite(dist)] = np.nan
+    landmarks.points[rows] = np.nanmedian(neighbours, axis=1)
+    return landmarks
 
 
 def normalize_vertices(vertices: np.ndarray) -> np.ndarray:
@@ -234,32 +317,15 @@ def normalize_vertices(vertices: np.ndarray) -> np.ndarray:
     return centered
 
 
-def compute_inter_pupillary_distance(landmarks: List[Dict[str, float]]) -> Optional[float]:
+def compute_inter_pupillary_distance(landmarks: LandmarkSet) -> Optional[float]:
     """
     Compute inter-pupillary distance from eye landmarks.
     """
-    left_eye = None
-    right_eye = None
-    
-    for lm in landmarks:
-        name = lm.get("name", "")
-        if "left_eye" in name and "outer" in name:
-            left_eye = np.array([lm["x"], lm["y"], lm["z"]])
-        elif "right_eye" in name and "outer" in name:
-            right_eye = np.array([lm["x"], lm["y"], lm["z"]])
-    
-    if left_eye is not None and right_eye is not None:
-        return float(np.linalg.norm(left_eye - right_eye))
-    
-    return None
+    return landmarks.distance("left_eye_outer", "right_eye_outer")
 
 
-def get_landmark_by_name(landmarks: List[Dict[str, float]], name: str) -> Optional[Dict[str, float]]:
+def get_landmark_by_name(landmarks: LandmarkSet, name: str) -> Optional[np.ndarray]:
     """
-    Get a specific landmark by name.
+    Get a specific landmark by name (read-only view, or None if missing).
     """
-    for lm in landmarks:
-        if lm.get("name") == name:
-            return lm
-    return None
-
+    return landmarks.get(name)
@@ -0,0 +1,64 @@
+"""
+Incremental per-session analysis for streamed landmark frames.
+
+Each WebSocket session keeps a rolling window of per-frame measurements and
+runs the rules engine on their running median, so single noisy frames don't
+flip recommendations. A new AnalysisResult is only produced when the
+recommendations change: an area appears or disappears, or the values quoted
+in an issue change at their displayed precision (e.g. "11.2mm" → "11.4mm").
+"""
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.models.analysis import AnalysisResult
+from app.models.landmark_set import LandmarkSet
+from app.services.facial_analysis import (
+    build_analysis_result,
+    compute_measurements_from_landmarks,
+    recommend_from_measurements,
+)
+
+
+class RunningMedian:
+    """Median of the last `window` values seen for each measurement."""
+    __slots__ = ("window", "_values")
+
+    def __init__(self, window: int):
+        self.window = max(1, window)
+        self._values: Dict[str, Deque[float]] = {}
+
+    def add(self, measurements: Dict[str, float]) -> None:
+        for name, value in measurements.items():
+            values = self._values.get(name)
+            if values is None:
+                values = self._values[name] = deque(maxlen=self.window)
+            values.append(value)
+
+    def current(self) -> Dict[str, float]:
+        return {name: float(np.median(values)) for name, values in self._values.items()}
+
+
+class LandmarkStreamSession:
+    """
+    State for one streaming client.
+    push() returns a new AnalysisResult when recommendations change, else None.
+    """
+
+    def __init__(self, window: Optional[int] = None):
+        self.aggregate = RunningMedian(window or settings.STREAM_MEDIAN_WINDOW)
+        self.frames = 0
+        self._last_recs: Optional[Tuple[Tuple[str, str, str], ...]] = None
+
+    def push(self, landmarks: LandmarkSet) -> Optional[AnalysisResult]:
+        self.frames += 1
+        self.aggregate.add(compute_measurements_from_landmarks(landmarks))
+
+        recs = recommend_from_measurements(self.aggregate.current())
+        # issue texts quote the (rounded) measurements, so compare them too
+        current = tuple((rec.area, rec.issue, rec.suggestion) for rec in recs)
+        if current == self._last_recs:
+            return None
+
+        self._last_recs = current
+        return build_analysis_result(recs)
@@ -0,0 +1,131 @@
+"""
+Low-poly preview meshes for the dashboard.
+
+After a scan is stored, a background task writes one reduced level of
+detail per face budget in PREVIEW_LODS as a compact GLB next to the scan:
+
+    uploads/3f/a9/<scan_id>.usdz.lod5000.glb
+
+Previews are centered the same way as the landmark extractor's vertices,
+and the detected landmarks are embedded as scene metadata
+(glTF `scenes[0].extras.landmarks`) so the dashboard can overlay them.
+
+Decimation is vertex clustering on a uniform grid: plain NumPy, linear time,
+no extra dependency. Quality is fine for thumbnails / browsing.
+"""
+import os
+import tempfile
+import zipfile
+from typing import List, Tuple
+import numpy as np
+import trimesh
+from app.core.config import settings
+from app.services.landmark_extractor import extract_landmarks_from_mesh
+from app.services.scan_layout import preview_path
+from app.services.scan_manager import atomic_file
+
+
+def preview_lods() -> List[int]:
+    """Configured face budgets, smallest first."""
+    return sorted(int(lod) for lod in settings.PREVIEW_LODS.split(",") if lod.strip())
+
+
+def _load_first_mesh(path: str) -> trimesh.Trimesh:
+    mesh = trimesh.load(path)
+    if isinstance(mesh, trimesh.Scene):
+        # same choice as the extractor: first geometry in the scene
+        if len(mesh.geometry) == 0:
+            raise ValueError("No geometry found in scene")
+        mesh = list(mesh.geometry.values())[0]
+    return mesh
+
+
+def load_full_mesh(mesh_path: str) -> trimesh.Trimesh:
+    """Load a scan (USDZ/OBJ/GLB) as a triangle mesh, faces included."""
+    if os.path.splitext(mesh_path)[1].lower() != ".usdz":
+        return _load_first_mesh(mesh_path)
+
+    # USDZ is a zip archive; use the first OBJ/GLB inside, like the extractor
+    with zipfile.ZipFile(mesh_path, "r") as zip_ref, tempfile.TemporaryDirectory() as temp_dir:
+        zip_ref.extractall(temp_dir)
+        for root, dirs, files in os.walk(temp_dir):
+            for file in files:
+                if file.endswith((".obj", ".glb", ".gltf")):
+                    return _load_first_mesh(os.path.join(root, file))
+    raise ValueError(f"No OBJ/GLB mesh inside {mesh_path}")
+
+
+def _cluster(vertices: np.ndarray, faces: np.ndarray, cell: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge all vertices in each grid cell into their mean; drop collapsed faces."""
+    keys = np.floor(vertices / cell).astype(np.int64)
+    _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+
+    merged = np.zeros((len(counts), 3))
+    np.add.at(merged, inverse, vertices)
+    merged /= counts[:, None]
+
+    new_faces = inverse[faces]
+    keep = (
+        (new_faces[:, 0] != new_faces[:, 1])
+        & (new_faces[:, 1] != new_faces[:, 2])
+        & (new_faces[:, 0] != new_faces[:, 2])
+    )
+    new_faces = new_faces[keep]
+    # the same triangle can come out of several source faces
+    _, unique_rows = np.unique(np.sort(new_faces, axis=1), axis=0, return_index=True)
+    return merged, new_faces[np.sort(unique_rows)]
+
+
+def decimate(vertices: np.ndarray, faces: np.ndarray, target_faces: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a mesh to at most ~target_faces triangles by vertex clustering.
+    Surface face count scales with 1/cell², so the cell size is re-estimated
+    from each attempt's result (a few passes at most).
+    """
+    if len(faces) <= target_faces:
+        return vertices, faces
+
+    extent = float(np.ptp(vertices, axis=0).max()) or 1.0
+    cell = extent / np.sqrt(target_faces / 2)
+    best = None
+    for _ in range(6):
+        reduced = _cluster(vertices, faces, cell)
+        count = len(reduced[1])
+        if count <= target_faces:
+            best = reduced
+            if count >= 0.8 * target_faces:
+                break
+        cell *= float(np.sqrt(max(count, 1) / target_faces)) * (1.05 if count > target_faces else 0.95)
+    return best if best is not None else reduced
+
+
+def generate_previews(scan_id: str, file_path: str) -> List[str]:
+    """
+    Write every configured preview LOD for a stored scan. Safe to run as a
+    background task: failures are logged, never raised.
+    """
+    try:
+        mesh = load_full_mesh(file_path)
+        vertices = np.asarray(mesh.vertices, dtype=np.float64)
+        faces = np.asarray(mesh.faces, dtype=np.int64)
+        # same centering as the extractor, so landmarks line up
+        vertices = vertices - vertices.mean(axis=0)
+        landmarks = extract_landmarks_from_mesh(file_path).to_dicts()
+    except Exception as e:
+        print(f"Warning: preview generation failed for {scan_id}: {e}")
+        return []
+
+    written = []
+    for lod in preview_lods():
+        lod_vertices, lod_faces = decimate(vertices, faces, lod)
+        scene = trimesh.Scene()
+        scene.add_geometry(trimesh.Trimesh(lod_vertices, lod_faces, process=False), node_name="face")
+        scene.metadata["scan_id"] = scan_id
+        scene.metadata["landmarks"] = landmarks
+
+        path = preview_path(file_path, lod)
+        with atomic_file(path, "wb") as f:
+            f.write(scene.export(file_type="glb"))
+        written.append(path)
+    return written
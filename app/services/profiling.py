@@ -0,0 +1,173 @@
+"""
+Opt-in sampling profiler for individual requests.
+
+A background thread snapshots the stack of the thread running the request
+every PROFILE_INTERVAL_MS and counts identical stacks. Output is the
+"folded" format used by flamegraph.pl / speedscope / inferno:
+
+    main.py:analyze_scan;storage.py:ingest_scan_file;landmark_extractor.py:detect_landmarks 42
+
+Profiles are stored in UPLOAD_DIR/profiles/<id>.folded, keyed by scan ID (or
+analysis ID for landmark requests), and served from /admin/profiles.
+`manage_storage gc` prunes them by age and count (prune_profiles).
+
+The request's own thread is sampled, except while the request has work
+running in a worker thread via run_in_worker(): then only that worker is
+sampled (the event loop would just show up idle). For async endpoints the
+request thread is the event loop, so other requests on the same loop can
+show up in the samples while the request awaits.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.scan_layout import PROFILES_DIR_NAME
+
+
+PROFILES_DIR = os.path.join(settings.UPLOAD_DIR, PROFILES_DIR_NAME)
+_active_profiler: ContextVar[Optional["SamplingProfiler"]] = ContextVar("active_profiler", default=None)
+
+
+class SamplingProfiler:
+    """Samples a request's stack on a timer and aggregates folded stacks."""
+
+    def __init__(self, interval: float, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        # worker threads currently running code for this request
+        self.worker_ids: set = set()
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.worker_ids) or [self.thread_id]:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Flamegraph-compatible collapsed stacks, one "stack count" per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+@contextmanager
+def maybe_profile(enabled: bool) -> Iterator[Optional[SamplingProfiler]]:
+    """Run the block under a SamplingProfiler if `enabled`, else do nothing."""
+    if not enabled:
+        yield None
+        return
+
+    profiler = SamplingProfiler(settings.PROFILE_INTERVAL_MS / 1000.0)
+    token = _active_profiler.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active_profiler.reset(token)
+
+
+async def run_in_worker(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    run_in_threadpool() that keeps the active request profile (if any)
+    sampling the worker thread while `func` runs.
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return await run_in_threadpool(func, *args, **kwargs)
+
+    def call():
+        thread_id = threading.get_ident()
+        profiler.worker_ids.add(thread_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.worker_ids.discard(thread_id)
+
+    return await run_in_threadpool(call)
+
+
+def save_profile(profile_id: str, profiler: SamplingProfiler) -> str:
+    """Store a finished profile under its scan / analysis ID."""
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    path = os.path.join(PROFILES_DIR, f"{os.path.basename(profile_id)}.folded")
+    with open(path, "w") as f:
+        f.write(profiler.folded())
+    print(
+        f"Profiled {profile_id}: {sum(profiler.samples.values())} samples "
+        f"over {profiler.duration * 1000:.0f}ms"
+    )
+    return path
+
+
+def list_profiles() -> List[Dict[str, object]]:
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILES_DIR)):
+        if not name.endswith(".folded"):
+            continue
+        path = os.path.join(PROFILES_DIR, name)
+        profiles.append({
+            "id": name[:-len(".folded")],
+            "size": os.path.getsize(path),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(os.path.getmtime(path))),
+        })
+    return profiles
+
+
+def get_profile_path(profile_id: str) -> Optional[str]:
+    path = os.path.join(PROFILES_DIR, f"{os.path.basename(profile_id)}.folded")
+    return path if os.path.exists(path) else None
+
+
+def prune_profiles(max_age_hours: float, max_count: int, dry_run: bool = False) -> int:
+    """
+    Delete profiles older than `max_age_hours` and all but the newest
+    `max_count` (either limit <= 0 = off). Returns how many.
+    """
+    if not os.path.isdir(PROFILES_DIR):
+        return 0
+    paths = [
+        os.path.join(PROFILES_DIR, name) for name in os.listdir(PROFILES_DIR) if name.endswith(".folded")
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+
+    cutoff = time.time() - max_age_hours * 3600
+    stale = [
+        path for rank, path in enumerate(paths)
+        if (max_count > 0 and rank >= max_count) or (max_age_hours > 0 and os.path.getmtime(path) < cutoff)
+    ]
+    if not dry_run:
+        for path in stale:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return len(stale)
@@ -0,0 +1,127 @@
+"""
+On-disk layout of hot scan files.
+
+Scans live in a hashed two-level directory tree under UPLOAD_DIR:
+
+    uploads/3f/a9/<scan_id>.usdz
+    uploads/3f/a9/<scan_id>.usdz.v1-<hash>.vertices.npy   (sidecars)
+
+so no single directory grows to hundreds of thousands of entries. Older
+deployments stored everything flat in UPLOAD_DIR; migrate_flat_layout()
+moves those files into place.
+"""
+import hashlib
+import os
+import re
+import time
+from typing import Dict, List, Set
+from app.core.config import settings
+from app.services.scan_manager import MetadataError, load_metadata, update_scans
+
+
+# Top-level files in UPLOAD_DIR that are not scans
+RESERVED_FILES = {"scans_metadata.json", "analysis_results.json", "reanalysis_checkpoint.log", "scans.lock"}
+COLD_DIR_NAME = "cold"
+INCOMING_DIR_NAME = "incoming"  # resumable upload sessions
+PROFILES_DIR_NAME = "profiles"  # opt-in request profiles
+PREVIEW_PATTERN = re.compile(r"\.lod\d+\.glb$")
+
+
+def shard_dir(scan_id: str) -> str:
+    """uploads/<h[0:2]>/<h[2:4]> where h is the SHA-1 of the scan ID."""
+    digest = hashlib.sha1(scan_id.encode()).hexdigest()
+    return os.path.join(settings.UPLOAD_DIR, digest[:2], digest[2:4])
+
+
+def scan_file_path(scan_id: str, ext: str) -> str:
+    """Where a hot scan file with this ID should live."""
+    return os.path.join(shard_dir(scan_id), f"{scan_id}.{ext}")
+
+
+def preview_path(file_path: str, lod: int) -> str:
+    """Preview GLB sidecar for a scan file at a given face budget."""
+    return f"{file_path}.lod{lod}.glb"
+
+
+def is_preview_file(path: str) -> bool:
+    return bool(PREVIEW_PATTERN.search(path))
+
+
+def related_files(file_path: str) -> List[str]:
+    """A scan file plus any sidecars derived from its path (vertex cache, ...)."""
+    directory = os.path.dirname(file_path) or "."
+    prefix = os.path.basename(file_path) + "."
+    if not os.path.isdir(directory):
+        return []
+    names = [name for name in os.listdir(directory) if name.startswith(prefix)]
+    paths = [os.path.join(directory, name) for name in names]
+    if os.path.exists(file_path):
+        paths.insert(0, file_path)
+    return paths
+
+
+def migrate_flat_layout(dry_run: bool = False) -> int:
+    """
+    Move scans stored flat in UPLOAD_DIR (and their sidecars) into the
+    sharded tree and update their file_path in one metadata write.
+    Returns the number of scans moved.
+    """
+    updates: Dict[str, dict] = {}
+    for scan in load_metadata(strict=True):
+        target = scan_file_path(scan.id, scan.format)
+        if scan.file_path == target or not os.path.exists(scan.file_path):
+            continue
+        if not dry_run:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            for path in related_files(scan.file_path):
+                suffix = os.path.basename(path)[len(os.path.basename(scan.file_path)):]
+                os.replace(path, target + suffix)
+        updates[scan.id] = {"file_path": target}
+
+    if not dry_run:
+        update_scans(updates)
+    return len(updates)
+
+
+def iter_hot_files():
+    """Every file in the hot tier (flat or sharded), excluding bookkeeping files."""
+    for root, dirs, files in os.walk(settings.UPLOAD_DIR):
+        if root == settings.UPLOAD_DIR:
+            dirs[:] = [d for d in dirs if d not in (COLD_DIR_NAME, INCOMING_DIR_NAME, PROFILES_DIR_NAME)]
+        for name in files:
+            # skip bookkeeping files and in-flight atomic writes
+            if name.endswith(".tmp"):
+                continue
+            if root == settings.UPLOAD_DIR and name in RESERVED_FILES:
+                continue
+            yield os.path.join(root, name)
+
+
+def collect_orphans(min_age_seconds: float = 3600, dry_run: bool = False, force: bool = False) -> List[str]:
+    """
+    Delete hot files whose scan ID has no metadata, plus hot leftovers of
+    scans already moved to the cold tier (their previews are kept). Files
+    younger than `min_age_seconds` are kept, since uploads are written
+    before their metadata. Returns the paths removed.
+
+    Raises MetadataError (deleting nothing) if the metadata is unreadable,
+    or if it is empty while hot files exist, unless `force`.
+    """
+    scans = load_metadata(strict=True)
+    if not scans and not force and next(iter_hot_files(), None) is not None:
+        raise MetadataError("scan metadata is empty but hot scan files exist")
+    hot_ids: Set[str] = {scan.id for scan in scans if scan.storage_tier == "hot"}
+    known_ids: Set[str] = {scan.id for scan in scans}
+    cutoff = time.time() - min_age_seconds
+
+    removed = []
+    for path in iter_hot_files():
+        scan_id = os.path.basename(path).split(".")[0]
+        if scan_id in hot_ids or os.path.getmtime(path) > cutoff:
+            continue
+        if scan_id in known_ids and is_preview_file(path):
+            continue
+        if not dry_run:
+            os.remove(path)
+        removed.append(path)
+    return removed
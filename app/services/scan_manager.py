@@ -1,20 +1,99 @@
 """
 Manages scan metadata and file operations.
 Stores scan information in a JSON file for simple persistence.
+
+The JSON files are shared by the API's worker threads and by the maintenance
+CLIs (reanalyze, manage_storage) running as separate processes, so every
+read-modify-write happens under metadata_lock().
 """
 import os
 import json
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
+from typing import IO, Dict, Iterator, List, Optional
+from app.models.analysis import AnalysisResult
 from app.models.scan import ScanMetadata
 from app.core.config import settings
 
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
 
 METADATA_FILE = os.path.join(settings.UPLOAD_DIR, "scans_metadata.json")
+RESULTS_FILE = os.path.join(settings.UPLOAD_DIR, "analysis_results.json")
+LOCK_FILE = os.path.join(settings.UPLOAD_DIR, "scans.lock")
+
+class MetadataError(RuntimeError):
+    """A metadata / results / index file exists but can't be read."""
+
+
+# Re-entrant so helpers can call each other while the lock is held; the
+# file lock is only taken by the outermost holder.
+_thread_lock = threading.RLock()
+_lock_depth = 0
+
+
+@contextmanager
+def metadata_lock() -> Iterator[None]:
+    """Exclusive access to the metadata / results / cold index files, across threads and processes."""
+    global _lock_depth
+    with _thread_lock:
+        if _lock_depth or fcntl is None:
+            _lock_depth += 1
+            try:
+                yield
+            finally:
+                _lock_depth -= 1
+            return
+
+        os.makedirs(os.path.dirname(LOCK_FILE) or ".", exist_ok=True)
+        with open(LOCK_FILE, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            _lock_depth += 1
+            try:
+                yield
+            finally:
+                _lock_depth -= 1
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
 
 
-def load_metadata() -> List[ScanMetadata]:
-    """Load all scan metadata from JSON file."""
+@contextmanager
+def atomic_file(path: str, mode: str = "w") -> Iterator[IO]:
+    """
+    Write to a uniquely named temp file next to `path`, which replaces
+    `path` only if the block succeeds. Concurrent writers never share a temp file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_atomic(path: str, data) -> None:
+    """Write JSON via temp file + rename so readers never see a partial file."""
+    with atomic_file(path) as f:
+        json.dump(data, f, indent=2, default=str)
+
+
+def load_metadata(strict: bool = False) -> List[ScanMetadata]:
+    """
+    Load all scan metadata from JSON file. An unreadable file counts as
+    empty, unless `strict`: then it raises MetadataError. Anything that
+    writes the file back or deletes data must load strictly.
+    """
     if not os.path.exists(METADATA_FILE):
         return []
     
@@ -23,21 +102,69 @@ def load_metadata() -> List[ScanMetadata]:
             data = json.load(f)
             return [ScanMetadata(**item) for item in data]
     except Exception as e:
+        if strict:
+            raise MetadataError(f"Can't read {METADATA_FILE}: {e}") from e
         print(f"Error loading metadata: {e}")
         return []
 
 
 def save_metadata(metadata: ScanMetadata) -> None:
     """Save scan metadata to JSON file."""
-    scans = load_metadata()
-    scans.append(metadata)
-    
-    # Convert to dict for JSON serialization
-    data = [scan.dict() for scan in scans]
+    with metadata_lock():
+        scans = load_metadata(strict=True)
+        scans.append(metadata)
+
+        # Convert to dict for JSON serialization
+        write_json_atomic(METADATA_FILE, [scan.dict() for scan in scans])
+
+
+def update_scans(updates: Dict[str, dict]) -> None:
+    """Apply field updates (scan ID → {field: value}) in one metadata write."""
+    if not updates:
+        return
+    with metadata_lock():
+        scans = load_metadata(strict=True)
+        for scan in scans:
+            for field, value in updates.get(scan.id, {}).items():
+                setattr(scan, field, value)
+        write_json_atomic(METADATA_FILE, [scan.dict() for scan in scans])
+
+
+def update_analysis_ids(analysis_ids: Dict[str, str]) -> None:
+    """Point many scans at new analysis results in one metadata write."""
+    update_scans({scan_id: {"analysis_id": analysis_id} for scan_id, analysis_id in analysis_ids.items()})
+
+
+def load_analysis_results(strict: bool = False) -> Dict[str, dict]:
+    """Load stored analysis results, keyed by scan ID (`strict` as in load_metadata)."""
+    if not os.path.exists(RESULTS_FILE):
+        return {}
     
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    with open(METADATA_FILE, "w") as f:
-        json.dump(data, f, indent=2, default=str)
+    try:
+        with open(RESULTS_FILE, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        if strict:
+            raise MetadataError(f"Can't read {RESULTS_FILE}: {e}") from e
+        print(f"Error loading analysis results: {e}")
+        return {}
+
+
+def save_analysis_results(results: Dict[str, AnalysisResult]) -> None:
+    """Store analysis results (scan ID → result) in one write."""
+    if not results:
+        return
+    with metadata_lock():
+        stored = load_analysis_results(strict=True)
+        for scan_id, result in results.items():
+            stored[scan_id] = result.dict()
+        write_json_atomic(RESULTS_FILE, stored)
+
+
+def get_analysis_result(scan_id: str) -> Optional[AnalysisResult]:
+    """Get the latest stored analysis result for a scan."""
+    data = load_analysis_results().get(scan_id)
+    return AnalysisResult(**data) if data else None
 
 
 def get_scan_by_id(scan_id: str) -> Optional[ScanMetadata]:
@@ -1,55 +1,99 @@
 import os
 import uuid
-from typing import Tuple
-from fastapi import UploadFile, HTTPException
-from app.core.config import settings
+from typing import Optional, Tuple
+from fastapi import BackgroundTasks, UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from app.services.admission import BATCH, admission
 from app.services.facial_analysis import analyze_landmarks
 from app.services.landmark_extractor import extract_landmarks_from_mesh
-from app.services.scan_manager import create_scan_metadata
+from app.services.preview import generate_previews
+from app.services.profiling import run_in_worker
+from app.services.scan_layout import scan_file_path
+from app.services.scan_manager import create_scan_metadata, save_analysis_results
 from app.models.analysis import AnalysisResult
+from app.models.landmark_set import LandmarkSet
 
 
-async def save_scan_and_analyze(file: UploadFile, device: str = None) -> Tuple[AnalysisResult, str]:
+def analyze_scan_file(path: str) -> AnalysisResult:
+    """
+    Extract landmarks from a stored 3D model and run analysis on them.
+    """
+    try:
+        landmarks = extract_landmarks_from_mesh(path)
+    except Exception as e:
+        # Log error but continue with an empty set (placeholder measurements) to keep API working
+        print(f"Warning: Landmark extraction failed: {e}")
+        landmarks = LandmarkSet.empty()
+
+    return analyze_landmarks(landmarks)
+
+
+async def save_scan_and_analyze(
+    file: UploadFile,
+    device: str = None,
+    background_tasks: Optional[BackgroundTasks] = None
+) -> Tuple[AnalysisResult, str]:
     """
     Save 3D scan → extract landmarks from it → run analysis.
+    Preview LODs are generated afterwards in `background_tasks` (if given).
     Returns: (AnalysisResult, scan_id)
     """
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     scan_id = str(uuid.uuid4())
     ext = file.filename.split(".")[-1] if file.filename else "usdz"
-    dest_path = os.path.join(settings.UPLOAD_DIR, f"{scan_id}.{ext}")
+    dest_path = scan_file_path(scan_id, ext)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
     # Save uploaded file
     content = await file.read()
-    file_size = len(content)
     with open(dest_path, "wb") as f:
         f.write(content)
 
-    # Extract landmarks from 3D model
-    try:
-        landmarks = extract_landmarks_from_mesh(dest_path)
-        
-        if not landmarks or len(landmarks) == 0:
-            # Fallback to placeholder if extraction fails
-            landmarks = [{"x": 0.0, "y": 0.0, "z": 0.0}]
-    except Exception as e:
-        # Log error but continue with placeholder to keep API working
-        print(f"Warning: Landmark extraction failed: {e}")
-        landmarks = [{"x": 0.0, "y": 0.0, "z": 0.0}]
-    
-    # Run analysis with extracted landmarks
-    result = analyze_landmarks(landmarks)
+    # CPU-heavy: keep it off the event loop so interactive requests aren't stuck behind it
+    result = await run_in_worker(
+        ingest_scan_file,
+        scan_id, dest_path, file.filename or f"scan.{ext}", device=device, background_tasks=background_tasks
+    )
+    return result, scan_id
+
+
+def ingest_scan_file(
+    scan_id: str,
+    dest_path: str,
+    filename: str,
+    device: str = None,
+    background_tasks: Optional[BackgroundTasks] = None
+) -> AnalysisResult:
+    """
+    Analyze a scan file already stored at `dest_path` (see scan_file_path)
+    and record its metadata + result.
+    """
+    ext = dest_path.split(".")[-1]
+
+    # Extract landmarks from 3D model and run analysis
+    result = analyze_scan_file(dest_path)
     
     # Save scan metadata
     create_scan_metadata(
         scan_id=scan_id,
-        filename=file.filename or f"scan.{ext}",
+        filename=filename,
         file_path=dest_path,
-        file_size=file_size,
+        file_size=os.path.getsize(dest_path),
         file_format=ext,
         analysis_id=result.id,
         device=device
     )
+    save_analysis_results({scan_id: result})
     
-    return result, scan_id
+    if background_tasks is not None:
+        background_tasks.add_task(build_previews_in_background, scan_id, dest_path)
+    
+    return result
 
+
+async def build_previews_in_background(scan_id: str, file_path: str) -> None:
+    """
+    Background task after ingest: generate_previews() in a batch-class slot,
+    so a burst of uploads can't flood the threadpool with preview builds.
+    """
+    async with admission.hold(BATCH):
+        await run_in_threadpool(generate_previews, scan_id, file_path)
@@ -0,0 +1,67 @@
+"""
+Persistent cache of normalized vertex arrays for stored scans.
+
+Parsing USDZ/GLB/OBJ through trimesh dominates extraction time, while only
+the normalized (N, 3) vertex array is used downstream. The array is saved as
+an .npy sidecar next to the scan and later loaded with mmap_mode="r", so
+repeat analyses skip mesh parsing and concurrent workers share the same
+page-cache pages.
+
+Sidecars are named after the scan file's content hash and the extractor
+version, so editing the file or bumping the version invalidates them.
+"""
+import glob
+import hashlib
+import os
+from typing import Optional
+import numpy as np
+from app.services.scan_manager import atomic_file
+
+
+SIDECAR_SUFFIX = ".vertices.npy"
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents (hex)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sidecar_path(mesh_path: str, digest: str, version: int) -> str:
+    """e.g. uploads/<scan_id>.usdz.v1-<hash16>.vertices.npy"""
+    return f"{mesh_path}.v{version}-{digest[:16]}{SIDECAR_SUFFIX}"
+
+
+def sidecar_paths(mesh_path: str) -> list:
+    """All vertex sidecars (any version / hash) belonging to a scan file."""
+    return glob.glob(f"{glob.escape(mesh_path)}.v*{SIDECAR_SUFFIX}")
+
+
+def load_cached_vertices(mesh_path: str, digest: str, version: int) -> Optional[np.ndarray]:
+    """Read-only memory-mapped vertex array, or None on a cache miss."""
+    path = sidecar_path(mesh_path, digest, version)
+    if not os.path.exists(path):
+        return None
+    try:
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable vertex cache {path}: {e}")
+        return None
+
+
+def store_cached_vertices(mesh_path: str, digest: str, version: int, vertices: np.ndarray) -> str:
+    """Write the sidecar atomically and drop stale ones for the same scan."""
+    path = sidecar_path(mesh_path, digest, version)
+    with atomic_file(path, "wb") as f:
+        np.save(f, np.ascontiguousarray(vertices, dtype=np.float64))
+
+    for stale in sidecar_paths(mesh_path):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
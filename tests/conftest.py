@@ -0,0 +1,21 @@
+"""
+Test setup: point UPLOAD_DIR at a throwaway directory before the app (and
+its module-level paths) is imported, and empty it before every test.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["UPLOAD_DIR"] = tempfile.mkdtemp(prefix="rhinovate-tests-")
+
+from app.core.config import settings  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def upload_dir():
+    shutil.rmtree(settings.UPLOAD_DIR, ignore_errors=True)
+    os.makedirs(settings.UPLOAD_DIR)
+    yield settings.UPLOAD_DIR
@@ -0,0 +1,106 @@
+import hashlib
+import io
+import os
+import pytest
+from fastapi.testclient import TestClient
+from app.api.middleware import classify
+from app.main import app
+from app.services.admission import BATCH, UPLOAD, PriorityClass, admission
+from app.services.preview import generate_previews
+from app.services.scan_manager import create_scan_metadata
+
+
+@pytest.fixture
+def saturated_upload_class(monkeypatch):
+    """Upload class with its only slot taken and no queue."""
+    cls = PriorityClass(UPLOAD, max_concurrency=1, max_queue=0, rate=0, burst=1)
+    cls.active = 1
+    monkeypatch.setitem(admission.classes, UPLOAD, cls)
+    return cls
+
+
+def test_only_interactive_requests_are_gated_for_their_whole_lifetime():
+    assert classify("POST", "/analysis/landmarks") is not None
+    assert classify("POST", "/analyze-scan") is None
+    assert classify("PUT", "/uploads/abc/chunks/0") is None
+    assert classify("GET", "/uploads/abc") is None
+
+
+def test_analysis_is_shed_when_upload_slots_are_full(saturated_upload_class):
+    client = TestClient(app)
+    response = client.post("/analyze-scan", files={"file": ("scan.obj", io.BytesIO(b"v 0 0 0\n"))})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert saturated_upload_class.shed == 1
+
+
+def test_upload_status_and_chunks_bypass_full_upload_class(saturated_upload_class):
+    client = TestClient(app)
+    session = client.post("/uploads/", json={"filename": "scan.obj", "size": 4}).json()
+    upload_id = session["upload_id"]
+
+    assert client.get(f"/uploads/{upload_id}").status_code == 200
+    response = client.put(
+        f"/uploads/{upload_id}/chunks/0",
+        params={"offset": 0},
+        content=b"v 0\n",
+        headers={"X-Chunk-SHA256": hashlib.sha256(b"v 0\n").hexdigest()},
+    )
+    assert response.status_code == 200
+    assert response.json()["complete"]
+    # finalize runs the analysis, so it does need a slot
+    assert client.post(f"/uploads/{upload_id}/finalize").status_code == 503
+    assert client.get(f"/uploads/{upload_id}").status_code == 200
+
+
+
+def test_on_demand_preview_build_is_gated_by_batch_class(monkeypatch, upload_dir):
+    cls = PriorityClass(BATCH, max_concurrency=1, max_queue=0, rate=0, burst=1)
+    cls.active = 1
+    monkeypatch.setitem(admission.classes, BATCH, cls)
+    path = os.path.join(upload_dir, "scan-1.obj")
+    with open(path, "w") as f:
+        f.write("v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n")
+    create_scan_metadata("scan-1", "scan.obj", path, os.path.getsize(path), "obj")
+    client = TestClient(app)
+
+    assert client.get("/scans/scan-1/preview").status_code == 503
+
+    # already built previews are served without a slot
+    generate_previews("scan-1", path)
+    assert client.get("/scans/scan-1/preview").status_code == 200
+
+
+def test_background_preview_builds_wait_for_a_batch_slot(monkeypatch, upload_dir):
+    import asyncio
+    from app.services import storage
+
+    cls = PriorityClass(BATCH, max_concurrency=1, max_queue=0, rate=0, burst=1)
+    monkeypatch.setitem(admission.classes, BATCH, cls)
+    running = []
+    peak = []
+
+    def build(scan_id, file_path):
+        running.append(scan_id)
+        peak.append(len(running))
+        import time
+        time.sleep(0.02)
+        running.remove(scan_id)
+
+    monkeypatch.setattr(storage, "generate_previews", build)
+
+    async def burst():
+        await asyncio.gather(*(storage.build_previews_in_background(f"s{i}", "x") for i in range(4)))
+
+    asyncio.run(burst())
+    assert max(peak) == 1  # never more than the batch class's concurrency
+    assert cls.admitted == 4 and cls.shed == 0 and cls.active == 0
+
+
+def test_reanalysis_workers_lower_their_priority(monkeypatch):
+    from app import reanalyze
+    calls = []
+    monkeypatch.setattr(os, "nice", calls.append)
+    reanalyze.lower_priority(10)
+    reanalyze.lower_priority(0)
+    assert calls == [10]
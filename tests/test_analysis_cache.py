@@ -0,0 +1,77 @@
+import time
+import numpy as np
+import pytest
+from app.models.analysis import AnalysisArea, AnalysisResult
+from app.models.landmark_set import LandmarkSet
+from app.services.analysis_cache import AnalysisCache, analysis_cache, analyze_landmarks_cached, landmark_cache_key
+
+
+def _points(*rows):
+    return LandmarkSet(np.array(rows, dtype=np.float64))
+
+
+def test_nearby_points_share_a_key():
+    assert landmark_cache_key(_points([0.10001, 0.2, 0.3]), 1e-3) == landmark_cache_key(_points([0.1, 0.2, 0.3]), 1e-3)
+
+
+@pytest.mark.parametrize("tolerance", [0.0, -1.0])
+def test_non_positive_tolerance_hashes_exact_points(tolerance):
+    a = landmark_cache_key(_points([0.1, 0.2, 0.3]), tolerance)
+    assert a != landmark_cache_key(_points([5, -7, 9]), tolerance)
+    assert a != landmark_cache_key(_points([0.10001, 0.2, 0.3]), tolerance)
+    assert a == landmark_cache_key(_points([0.1, 0.2, 0.3]), tolerance)
+
+
+def test_huge_coordinates_do_not_collide():
+    assert landmark_cache_key(_points([1e30, 0, 0]), 1e-4) != landmark_cache_key(_points([-1e30, 0, 0]), 1e-4)
+
+
+def test_missing_landmarks_are_distinct_from_values():
+    assert landmark_cache_key(_points([np.nan, 0, 0]), 1e-4) != landmark_cache_key(_points([0, 0, 0]), 1e-4)
+
+
+def result(name):
+    return AnalysisResult(id=name, areas=[AnalysisArea(area=name, issue="i", suggestion="s")])
+
+
+def test_lru_evicts_least_recently_used_and_counts():
+    cache = AnalysisCache(max_size=2, ttl=60)
+    cache.put("a", result("a"))
+    cache.put("b", result("b"))
+    assert cache.get("a").id == "a"  # "b" is now least recently used
+    cache.put("c", result("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").id == "a" and cache.get("c").id == "c"
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 3, 1, 1)
+    assert stats["hit_rate"] == 0.75
+
+
+def test_entries_expire_after_ttl():
+    cache = AnalysisCache(max_size=4, ttl=0.05)
+    cache.put("a", result("a"))
+    assert cache.get("a") is not None
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = AnalysisCache(max_size=0, ttl=60)
+    cache.put("a", result("a"))
+    assert cache.get("a") is None
+
+
+def test_callers_cannot_corrupt_cached_results():
+    analysis_cache.clear()
+    landmarks = _points([0.1, 0.2, 0.3], [0.4, 0.5, 0.6])
+    first = analyze_landmarks_cached(landmarks)
+    first.id = "changed"
+    first.areas.clear()
+
+    second = analyze_landmarks_cached(landmarks)
+    assert second.id != "changed"
+    assert second.areas
+    second.areas[0].issue = "changed"
+    assert analyze_landmarks_cached(landmarks).areas[0].issue != "changed"
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.main import app
+from app.models.upload import UploadSessionCreate
+from app.services import chunked_upload, scan_manager
+
+OBJ = b"".join(b"v %d %d %d\n" % (i, i * 2, i * 3) for i in range(200)) + b"f 1 2 3\n"
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 512)
+
+
+def start(client, data=OBJ, **extra):
+    response = client.post("/uploads/", json={"filename": "face.obj", "size": len(data), **extra})
+    assert response.status_code == 200
+    return response.json()
+
+
+def put(client, upload_id, index, data, chunk_size=512, sha=None):
+    chunk = data[index * chunk_size:(index + 1) * chunk_size]
+    return client.put(
+        f"/uploads/{upload_id}/chunks/{index}",
+        params={"offset": index * chunk_size},
+        content=chunk,
+        headers={"X-Chunk-SHA256": sha or hashlib.sha256(chunk).hexdigest()},
+    )
+
+
+def test_out_of_order_chunks_with_retries_finalize_to_the_same_file(small_chunks):
+    client = TestClient(app)
+    session = start(client, sha256=hashlib.sha256(OBJ).hexdigest())
+    upload_id, total = session["upload_id"], session["total_chunks"]
+    assert total > 3
+
+    order = list(reversed(range(total)))
+    for index in order[:2]:
+        assert put(client, upload_id, index, OBJ).status_code == 200
+    assert put(client, upload_id, order[0], OBJ).status_code == 200  # retransmit
+
+    status = client.get(f"/uploads/{upload_id}").json()
+    assert status["missing_chunks"] == list(range(total - 2))
+    assert status["received"] == [[(total - 2) * 512, len(OBJ)]]
+
+    for index in order[2:]:
+        assert put(client, upload_id, index, OBJ).status_code == 200
+    assert client.get(f"/uploads/{upload_id}").json()["complete"]
+
+    response = client.post(f"/uploads/{upload_id}/finalize")
+    assert response.status_code == 200
+    scan = scan_manager.get_scan_by_id(response.json()["id"])
+    with open(scan.file_path, "rb") as f:
+        assert f.read() == OBJ
+    assert client.get(f"/uploads/{upload_id}").status_code == 404
+    assert client.post(f"/uploads/{upload_id}/finalize").status_code == 404
+
+
+def test_chunk_checksum_mismatch_is_rejected(small_chunks):
+    client = TestClient(app)
+    upload_id = start(client)["upload_id"]
+
+    response = put(client, upload_id, 0, OBJ, sha="0" * 64)
+    assert response.status_code == 400
+    assert "checksum" in response.json()["detail"]
+    assert 0 in client.get(f"/uploads/{upload_id}").json()["missing_chunks"]
+
+
+def test_bad_offset_and_size_are_rejected(small_chunks):
+    client = TestClient(app)
+    upload_id = start(client)["upload_id"]
+    chunk = OBJ[:512]
+    response = client.put(
+        f"/uploads/{upload_id}/chunks/1",
+        params={"offset": 0},
+        content=chunk,
+        headers={"X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()},
+    )
+    assert response.status_code == 400
+    assert put(client, upload_id, 0, OBJ[:100]).status_code == 400
+
+
+def test_finalize_requires_every_chunk_and_matching_file_checksum(small_chunks):
+    client = TestClient(app)
+    upload_id = start(client, sha256="0" * 64)["upload_id"]
+    assert put(client, upload_id, 0, OBJ).status_code == 200
+    assert client.post(f"/uploads/{upload_id}/finalize").status_code == 409
+
+    total = client.get(f"/uploads/{upload_id}").json()["total_chunks"]
+    for index in range(1, total):
+        put(client, upload_id, index, OBJ)
+    response = client.post(f"/uploads/{upload_id}/finalize")
+    assert response.status_code == 409
+    assert "checksum" in response.json()["detail"]
+    # session released again, nothing ingested
+    assert client.get(f"/uploads/{upload_id}").json()["complete"]
+    assert scan_manager.load_metadata() == []
+
+
+def test_oversized_session_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 1024)
+    client = TestClient(app)
+    response = client.post("/uploads/", json={"filename": "face.obj", "size": 10 ** 13})
+    assert response.status_code == 413
+    assert not os.path.isdir(chunked_upload.INCOMING_DIR) or not os.listdir(chunked_upload.INCOMING_DIR)
+
+
+def test_concurrent_finalize_ingests_once(small_chunks):
+    session = chunked_upload.create_session(UploadSessionCreate(filename="face.obj", size=len(OBJ)))
+    for index in range(session.total_chunks):
+        chunk = OBJ[index * 512:(index + 1) * 512]
+        chunked_upload.write_chunk(session.upload_id, index, index * 512, chunk, hashlib.sha256(chunk).hexdigest())
+
+    outcomes = []
+    barrier = threading.Barrier(2)
+
+    def finalize():
+        barrier.wait()
+        try:
+            outcomes.append(chunked_upload.finalize(session.upload_id))
+        except chunked_upload.UploadConflict as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=finalize) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(outcomes) == 2
+    assert sum(isinstance(outcome, tuple) for outcome in outcomes) == 1
+    # the loser either lost the claim (409) or found the session already gone (404)
+    assert all(isinstance(outcome, (tuple, chunked_upload.UploadConflict)) or outcome is None for outcome in outcomes)
+    assert len(scan_manager.load_metadata()) == 1
+
+
+def test_oversized_chunk_body_is_rejected_before_buffering(small_chunks):
+    client = TestClient(app)
+    upload_id = start(client)["upload_id"]
+    body = b"x" * 2048
+    headers = {"X-Chunk-SHA256": hashlib.sha256(body).hexdigest()}
+
+    response = client.put(f"/uploads/{upload_id}/chunks/0", params={"offset": 0}, content=body, headers=headers)
+    assert response.status_code == 413
+
+    # no Content-Length (chunked transfer): the running count catches it
+    def stream():
+        for _ in range(8):
+            yield b"x" * 256
+    response = client.put(f"/uploads/{upload_id}/chunks/0", params={"offset": 0}, content=stream(), headers=headers)
+    assert response.status_code == 413
+    assert 0 in client.get(f"/uploads/{upload_id}").json()["missing_chunks"]
+
+    assert client.put(
+        "/uploads/00000000-0000-0000-0000-000000000000/chunks/0", params={"offset": 0}, content=b"x", headers=headers
+    ).status_code == 404
+
+
+def test_stale_session_gc_skips_sessions_that_vanish(monkeypatch, small_chunks):
+    session = chunked_upload.create_session(UploadSessionCreate(filename="face.obj", size=len(OBJ)))
+    real_listdir = os.listdir
+
+    def listdir(path):
+        names = real_listdir(path)
+        return names + ["finalized-meanwhile"] if path == chunked_upload.INCOMING_DIR else names
+
+    monkeypatch.setattr(os, "listdir", listdir)
+    assert chunked_upload.collect_stale_sessions(max_age_hours=0) == 1
+    assert chunked_upload.get_status(session.upload_id) is None
@@ -0,0 +1,56 @@
+import numpy as np
+from app.models.landmark_set import LANDMARK_INDEX, LandmarkSet
+from app.services.landmark_extractor import detect_landmarks, refine_landmarks
+
+NOSE = LANDMARK_INDEX["nose_tip"]
+
+
+def grid(n=50, spacing=0.001):
+    xs, ys = np.meshgrid(np.arange(n) * spacing, np.arange(n) * spacing)
+    return np.column_stack([xs.ravel(), ys.ravel(), np.zeros(n * n)])
+
+
+def with_nose_at(point):
+    landmarks = LandmarkSet.empty()
+    landmarks.points[NOSE] = point
+    return landmarks
+
+
+def test_single_spike_in_front_of_the_nose_is_pulled_back_to_the_surface():
+    vertices = grid()
+    spike = len(vertices) // 2 + 25
+    vertices[spike, 2] = 0.02  # one noisy vertex 2cm in front of a flat surface
+
+    landmarks = detect_landmarks(vertices)  # argmax(z) picks the spike, then refines
+    assert landmarks.get("nose_tip")[2] == 0.0
+    np.testing.assert_allclose(landmarks.get("nose_tip")[:2], vertices[spike, :2], atol=0.003)
+
+
+def test_radius_masks_far_neighbours():
+    far = np.random.default_rng(0).normal(loc=1.0, scale=0.01, size=(20, 3))
+    vertices = np.vstack([[0.0, 0.0, 0.0], far])
+
+    unbounded = refine_landmarks(vertices, with_nose_at((0, 0, 0)), k=8, radius=None)
+    assert unbounded.get("nose_tip")[0] > 0.5  # pulled into the far cluster
+
+    # k=8 but only the candidate itself is within the radius (the rest: idx == N, dist inf)
+    bounded = refine_landmarks(vertices, with_nose_at((0, 0, 0)), k=8, radius=0.1)
+    np.testing.assert_array_equal(bounded.get("nose_tip"), [0, 0, 0])
+
+
+def test_k_of_one_or_tiny_mesh_leaves_landmarks_unchanged():
+    vertices = grid(10)
+    point = vertices[37]
+    assert refine_landmarks(vertices, with_nose_at(point), k=1).get("nose_tip").tolist() == point.tolist()
+
+    single = np.array([[0.1, 0.2, 0.3]])
+    assert refine_landmarks(single, with_nose_at(single[0]), k=16).get("nose_tip").tolist() == [0.1, 0.2, 0.3]
+
+    # fewer vertices than k: uses all of them, without index errors
+    three = np.array([[0, 0, 0], [0, 0, 1.0], [0, 0, 2.0]])
+    assert refine_landmarks(three, with_nose_at(three[2]), k=16).get("nose_tip").tolist() == [0, 0, 1.0]
+
+
+def test_missing_landmarks_stay_missing():
+    landmarks = refine_landmarks(grid(10), LandmarkSet.empty(), k=8)
+    assert len(landmarks) == 0
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from app.models.landmark_set import LANDMARK_INDEX, LANDMARK_NAMES, LandmarkSet
+from app.models.landmarks import Landmark
+from app.services.facial_analysis import compute_measurements_from_landmarks
+
+
+def test_from_models_named_uses_fixed_schema():
+    landmarks = LandmarkSet.from_models([
+        Landmark(x=1, y=2, z=3, name="chin"),
+        Landmark(x=4, y=5, name="nose_tip"),
+    ])
+    assert landmarks.schema is LANDMARK_INDEX
+    assert landmarks.points.shape == (len(LANDMARK_NAMES), 3)
+    assert landmarks.get("chin").tolist() == [1, 2, 3]
+    assert landmarks.get("nose_tip").tolist() == [4, 5, 0]  # z=None → 0
+
+
+def test_from_models_anonymous_keeps_order():
+    landmarks = LandmarkSet.from_models([Landmark(x=1, y=2), Landmark(x=3, y=4, z=5)])
+    assert landmarks.schema is None
+    assert landmarks.points.tolist() == [[1, 2, 0], [3, 4, 5]]
+    assert landmarks.get("nose_tip") is None
+    assert len(landmarks) == 2
+
+
+def test_from_models_mixed_drops_unnamed_and_unknown_points():
+    landmarks = LandmarkSet.from_models([
+        Landmark(x=1, y=1, z=1, name="chin"),
+        Landmark(x=9, y=9, z=9),
+        Landmark(x=8, y=8, z=8, name="ear_lobe"),
+    ])
+    assert landmarks.schema is LANDMARK_INDEX
+    assert len(landmarks) == 1
+    assert landmarks.to_dicts() == [{"x": 1.0, "y": 1.0, "z": 1.0, "name": "chin"}]
+
+
+def test_len_and_get_skip_nan_rows():
+    landmarks = LandmarkSet.empty()
+    assert len(landmarks) == 0
+    assert landmarks.get("chin") is None
+    assert "chin" not in landmarks
+
+    landmarks.points[LANDMARK_INDEX["chin"]] = (0, -1, 0.5)
+    assert len(landmarks) == 1
+    assert "chin" in landmarks
+    assert landmarks.distance("chin", "nose_tip") is None
+    assert landmarks.get("not_a_landmark") is None
+
+
+@pytest.mark.parametrize("named", [True, False])
+def test_to_dicts_round_trips(named):
+    models = [
+        Landmark(x=0.1, y=0.2, z=0.3, name="nose_tip" if named else None),
+        Landmark(x=-0.1, y=0.5, z=0.0, name="left_eye_inner" if named else None),
+    ]
+    landmarks = LandmarkSet.from_models(models)
+    again = LandmarkSet.from_models(landmarks.to_models())
+    assert again.schema == landmarks.schema
+    np.testing.assert_array_equal(again.points, landmarks.points)
+
+
+def test_ipd_falls_back_to_inner_eye_landmarks():
+    # regression: `or` on numpy rows raised "truth value of an array is ambiguous"
+    landmarks = LandmarkSet.from_models([
+        Landmark(x=0, y=0, z=0.1, name="nose_tip"),
+        Landmark(x=-0.03, y=0.04, z=0, name="left_eye_outer"),
+        Landmark(x=0.015, y=0.04, z=0, name="right_eye_inner"),
+    ])
+    measurements = compute_measurements_from_landmarks(landmarks)
+    # 0.4 (IPD-based estimate) instead of the 0.52 placeholder used when no IPD is found
+    assert measurements["nose_to_ipd_ratio"] == pytest.approx(0.4)
@@ -0,0 +1,70 @@
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.landmark_set import LandmarkSet
+from app.models.landmarks import Landmark
+from app.services.landmark_stream import LandmarkStreamSession
+
+FRAME = {"landmarks": [{"x": 0.1 * i, "y": 0.2 * i, "z": 0.0} for i in range(10)], "device": "iPhone"}
+
+
+def test_malformed_and_binary_frames_keep_the_stream_open():
+    client = TestClient(app)
+    with client.websocket_connect("/analysis/landmarks/stream") as ws:
+        ws.send_bytes(b"\xff\xfe not utf-8")
+        assert "error" in ws.receive_json()
+        ws.send_text("{not json")
+        assert "error" in ws.receive_json()
+        ws.send_bytes(b"[1, 2]")
+        assert "error" in ws.receive_json()
+
+        ws.send_bytes(json.dumps(FRAME).encode())
+        result = ws.receive_json()
+        assert "error" not in result and "areas" in result
+
+
+def frame(chin_projection_mm):
+    """Named landmarks whose only varying measurement is the chin projection."""
+    return LandmarkSet.from_models([
+        Landmark(x=0, y=0, z=0, name="nose_tip"),
+        Landmark(x=0, y=-0.06, z=-chin_projection_mm / 1000, name="chin"),
+    ])
+
+
+def areas(result):
+    return [area.area for area in result.areas]
+
+
+def test_stable_stream_pushes_once():
+    session = LandmarkStreamSession(window=5)
+    results = [session.push(frame(10.0)) for _ in range(8)]
+    assert results[0] is not None and "Chin" in areas(results[0])
+    assert results[1:] == [None] * 7
+
+
+def test_single_outlier_frame_does_not_push():
+    session = LandmarkStreamSession(window=5)
+    for _ in range(4):
+        session.push(frame(10.0))
+    assert session.push(frame(30.0)) is None  # median still 10.0mm
+    assert session.push(frame(10.0)) is None
+
+
+def test_sustained_change_pushes():
+    session = LandmarkStreamSession(window=5)
+    for _ in range(5):
+        session.push(frame(10.0))
+    pushed = [session.push(frame(30.0)) for _ in range(5)]
+    changed = [result for result in pushed if result is not None]
+    assert len(changed) == 1
+    assert "Chin" not in areas(changed[0])
+
+
+def test_changed_measurement_in_same_area_pushes():
+    session = LandmarkStreamSession(window=3)
+    for _ in range(3):
+        session.push(frame(10.0))
+    pushed = [result for result in (session.push(frame(11.0)) for _ in range(3)) if result is not None]
+    assert len(pushed) == 1
+    chin = next(area for area in pushed[0].areas if area.area == "Chin")
+    assert "11.0mm" in chin.issue
@@ -0,0 +1,164 @@
+import os
+import sys
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app import manage_storage
+from app.main import app
+from app.services import cold_storage, scan_manager
+from app.services.scan_layout import collect_orphans, migrate_flat_layout, scan_file_path
+
+
+def make_scan(scan_id, path, content=b"v 0 0 0\n", days_old=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    scan_manager.create_scan_metadata(scan_id, f"{scan_id}.obj", path, len(content), "obj")
+    if days_old:
+        scan_manager.update_scans({scan_id: {"uploaded_at": datetime.now() - timedelta(days=days_old)}})
+    return path
+
+
+def run_cli(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["manage_storage", *args])
+    manage_storage.main()
+
+
+def corrupt(path):
+    with open(path, "a") as f:
+        f.write("{not json")
+
+
+def test_migrate_moves_flat_scans_and_sidecars(upload_dir):
+    flat = make_scan("a", os.path.join(upload_dir, "a.obj"))
+    with open(flat + ".v1-abc.vertices.npy", "wb") as f:
+        f.write(b"cache")
+
+    assert migrate_flat_layout(dry_run=True) == 1
+    assert os.path.exists(flat)
+
+    assert migrate_flat_layout() == 1
+    target = scan_file_path("a", "obj")
+    assert scan_manager.get_scan_by_id("a").file_path == target
+    assert os.path.exists(target) and os.path.exists(target + ".v1-abc.vertices.npy")
+    assert not os.path.exists(flat)
+    assert migrate_flat_layout() == 0
+
+
+def test_retention_packs_old_scans_and_download_serves_them(upload_dir):
+    old_path = make_scan("old", scan_file_path("old", "obj"), b"old scan bytes", days_old=100)
+    preview = old_path + ".lod5000.glb"
+    with open(preview, "wb") as f:
+        f.write(b"glb")
+    make_scan("new", scan_file_path("new", "obj"), b"new scan bytes")
+
+    assert cold_storage.apply_retention(90, dry_run=True) == 1
+    assert os.path.exists(old_path)
+
+    assert cold_storage.apply_retention(90) == 1
+    assert not os.path.exists(old_path)
+    assert os.path.exists(preview)
+    assert scan_manager.get_scan_by_id("old").storage_tier == "cold"
+    assert scan_manager.get_scan_by_id("new").storage_tier == "hot"
+    assert set(cold_storage.load_index()) == {"old"}
+
+    client = TestClient(app)
+    response = client.get("/scans/old/download")
+    assert response.status_code == 200
+    assert response.content == b"old scan bytes"
+    assert client.get("/scans/new/download").content == b"new scan bytes"
+
+
+def test_retention_appends_to_existing_index(upload_dir):
+    make_scan("first", scan_file_path("first", "obj"), b"first", days_old=100)
+    cold_storage.apply_retention(90)
+    make_scan("second", scan_file_path("second", "obj"), b"second", days_old=100)
+    cold_storage.apply_retention(90)
+
+    index = cold_storage.load_index()
+    assert set(index) == {"first", "second"}
+    assert b"".join(cold_storage.iter_cold_scan(index["first"])) == b"first"
+
+
+def test_retention_aborts_on_corrupt_index(monkeypatch, upload_dir):
+    make_scan("first", scan_file_path("first", "obj"), b"first", days_old=100)
+    cold_storage.apply_retention(90)
+    old_path = make_scan("second", scan_file_path("second", "obj"), b"second", days_old=100)
+    corrupt(cold_storage.INDEX_FILE)
+    packs = sorted(os.listdir(cold_storage.COLD_DIR))
+
+    with pytest.raises(SystemExit) as exit_info:
+        run_cli(monkeypatch, "retention", "--days", "90")
+    assert exit_info.value.code == 1
+    assert os.path.exists(old_path)
+    assert sorted(os.listdir(cold_storage.COLD_DIR)) == packs
+    assert scan_manager.get_scan_by_id("second").storage_tier == "hot"
+
+
+def test_gc_removes_orphans_only(upload_dir):
+    kept = make_scan("kept", scan_file_path("kept", "obj"))
+    orphan = scan_file_path("gone", "obj")
+    young = scan_file_path("young", "obj")
+    for path in (orphan, young):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x")
+    past = datetime.now().timestamp() - 7200
+    os.utime(orphan, (past, past))
+
+    assert collect_orphans(min_age_seconds=3600, dry_run=True) == [orphan]
+    assert os.path.exists(orphan)
+    assert collect_orphans(min_age_seconds=3600) == [orphan]
+    assert not os.path.exists(orphan)
+    assert os.path.exists(kept) and os.path.exists(young)
+
+
+def test_gc_drops_cold_entries_of_deleted_scans(upload_dir):
+    make_scan("old", scan_file_path("old", "obj"), days_old=100)
+    make_scan("older", scan_file_path("older", "obj"), days_old=200)
+    cold_storage.apply_retention(90)
+    with scan_manager.metadata_lock():
+        scans = [scan.dict() for scan in scan_manager.load_metadata() if scan.id != "older"]
+        scan_manager.write_json_atomic(scan_manager.METADATA_FILE, scans)
+
+    assert cold_storage.collect_cold_orphans(min_age_seconds=0) == 1
+    assert set(cold_storage.load_index()) == {"old"}
+    assert len(os.listdir(cold_storage.COLD_DIR)) == 2  # pack still used by "old" + index
+
+
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_gc_aborts_on_corrupt_metadata(monkeypatch, capsys, upload_dir, dry_run):
+    make_scan("cold", scan_file_path("cold", "obj"), days_old=100)
+    cold_storage.apply_retention(90)
+    paths = [make_scan(f"s{i}", scan_file_path(f"s{i}", "obj")) for i in range(3)]
+    index_before = cold_storage.load_index()
+    corrupt(scan_manager.METADATA_FILE)
+
+    with pytest.raises(SystemExit) as exit_info:
+        run_cli(monkeypatch, "gc", "--min-age", "0", *(["--dry-run"] if dry_run else []))
+    assert exit_info.value.code == 1
+    assert "Aborted" in capsys.readouterr().err
+    assert all(os.path.exists(path) for path in paths)
+    assert cold_storage.load_index() == index_before
+    assert any(name.endswith(".pack") for name in os.listdir(cold_storage.COLD_DIR))
+
+
+def test_gc_refuses_empty_metadata_unless_forced(monkeypatch, upload_dir):
+    path = make_scan("a", scan_file_path("a", "obj"))
+    scan_manager.write_json_atomic(scan_manager.METADATA_FILE, [])
+
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, "gc", "--min-age", "0")
+    assert os.path.exists(path)
+
+    run_cli(monkeypatch, "gc", "--min-age", "0", "--force")
+    assert not os.path.exists(path)
+
+
+def test_uploads_refuse_to_overwrite_corrupt_metadata(upload_dir):
+    make_scan("a", scan_file_path("a", "obj"))
+    corrupt(scan_manager.METADATA_FILE)
+    with pytest.raises(scan_manager.MetadataError):
+        make_scan("b", scan_file_path("b", "obj"))
+    with open(scan_manager.METADATA_FILE) as f:
+        assert '"id": "a"' in f.read()
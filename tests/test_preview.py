@@ -0,0 +1,51 @@
+import json
+import os
+import struct
+import numpy as np
+import pytest
+import trimesh
+from app.services.preview import decimate, generate_previews, preview_lods
+
+
+@pytest.fixture(scope="module")
+def sphere():
+    mesh = trimesh.creation.icosphere(subdivisions=6, radius=0.1)  # 81,920 faces
+    return np.asarray(mesh.vertices), np.asarray(mesh.faces)
+
+
+def glb_json(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    length, kind = struct.unpack_from("<I4s", data, 12)
+    assert kind == b"JSON"
+    return json.loads(data[20:20 + length])
+
+
+@pytest.mark.parametrize("budget", [5000, 20000])
+def test_decimate_stays_within_budget(sphere, budget):
+    vertices, faces = sphere
+    assert len(faces) > 80000
+    _, lod_faces = decimate(vertices, faces, budget)
+    assert 0.8 * budget <= len(lod_faces) <= budget
+
+
+def test_mesh_under_budget_is_returned_unchanged(sphere):
+    vertices, faces = sphere
+    out_vertices, out_faces = decimate(vertices, faces, len(faces))
+    assert out_vertices is vertices and out_faces is faces
+
+
+def test_generate_previews_writes_each_lod_with_landmarks(sphere, upload_dir):
+    vertices, faces = sphere
+    path = os.path.join(upload_dir, "scan.obj")
+    trimesh.Trimesh(vertices, faces, process=False).export(path)
+
+    written = generate_previews("scan", path)
+    assert len(written) == len(preview_lods())
+    for lod, preview in zip(preview_lods(), written):
+        assert preview.endswith(f".lod{lod}.glb")
+        mesh = trimesh.load(preview, force="mesh")
+        assert 0.8 * lod <= len(mesh.faces) <= lod
+        extras = glb_json(preview)["scenes"][0]["extras"]
+        assert extras["scan_id"] == "scan"
+        assert {lm["name"] for lm in extras["landmarks"]} >= {"nose_tip", "chin"}
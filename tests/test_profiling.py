@@ -0,0 +1,33 @@
+import os
+import time
+from fastapi.testclient import TestClient
+from app.api.dependencies import is_admin_token
+from app.core.config import settings
+from app.main import app
+from app.services import profiling
+
+
+def test_non_ascii_admin_token_is_rejected_not_an_error(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    client = TestClient(app)
+    response = client.get("/admin/profiles", headers={"X-Admin-Token": "é".encode("latin-1")})
+    assert response.status_code == 403
+    assert not is_admin_token("é")
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+def test_prune_profiles_by_age_and_count(upload_dir):
+    os.makedirs(profiling.PROFILES_DIR)
+    now = time.time()
+    for i in range(5):
+        path = os.path.join(profiling.PROFILES_DIR, f"p{i}.folded")
+        with open(path, "w") as f:
+            f.write("a;b 1\n")
+        age = i * 3600
+        os.utime(path, (now - age, now - age))
+
+    assert profiling.prune_profiles(max_age_hours=2.5, max_count=0, dry_run=True) == 2
+    assert len(os.listdir(profiling.PROFILES_DIR)) == 5
+
+    assert profiling.prune_profiles(max_age_hours=2.5, max_count=2) == 3
+    assert sorted(os.listdir(profiling.PROFILES_DIR)) == ["p0.folded", "p1.folded"]
@@ -0,0 +1,67 @@
+import os
+from app import reanalyze
+from app.services import scan_manager
+from app.services.storage import analyze_scan_file
+
+
+def test_flush_keeps_scans_added_during_the_run(upload_dir):
+    path = os.path.join(upload_dir, "old.obj")
+    with open(path, "w") as f:
+        f.write("v 0 0 0\n")
+    scan_manager.create_scan_metadata("old", "old.obj", path, 8, "obj", analysis_id="a-1")
+    result = analyze_scan_file(path)
+
+    # an upload lands after the run loaded its scan list
+    scan_manager.create_scan_metadata("new", "new.obj", path, 8, "obj", analysis_id="a-2")
+    scan_manager.save_analysis_results({"new": analyze_scan_file(path)})
+
+    done = set()
+    reanalyze.flush({"old": result}, done)
+
+    scans = {scan.id: scan for scan in scan_manager.load_metadata()}
+    assert set(scans) == {"old", "new"}
+    assert scans["old"].analysis_id == result.id
+    assert scans["new"].analysis_id == "a-2"
+    assert set(scan_manager.load_analysis_results()) == {"old", "new"}
+    assert done == {"old"}
+
+
+def test_checkpoint_is_appended_and_resumed(upload_dir):
+    path = os.path.join(upload_dir, "scan.obj")
+    with open(path, "w") as f:
+        f.write("v 0 0 0\n")
+    for scan_id in ("a", "b", "c"):
+        scan_manager.create_scan_metadata(scan_id, "scan.obj", path, 8, "obj")
+    result = analyze_scan_file(path)
+
+    done = set()
+    reanalyze.flush({"a": result}, done)
+    reanalyze.flush({"b": result}, done)
+    with open(reanalyze.CHECKPOINT_FILE) as f:
+        assert f.read() == "a\nb\n"
+    assert reanalyze.load_checkpoint() == {"a", "b"}
+
+    # an interrupted run resumes with only "c" left, then clears the checkpoint
+    assert reanalyze.reanalyze_all(workers=1, chunk_size=1, flush_every=1) == 1
+    assert not os.path.exists(reanalyze.CHECKPOINT_FILE)
+
+
+def test_cold_scans_are_reanalyzed_from_their_pack(upload_dir):
+    from datetime import datetime, timedelta
+    from app.services.cold_storage import apply_retention
+    from app.services.scan_layout import scan_file_path
+
+    path = scan_file_path("cold", "obj")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("".join(f"v {i % 7} {i % 5} {i % 3}\n" for i in range(50)))
+    scan_manager.create_scan_metadata("cold", "cold.obj", path, os.path.getsize(path), "obj", analysis_id="stale")
+    scan_manager.update_scans({"cold": {"uploaded_at": datetime.now() - timedelta(days=100)}})
+    assert apply_retention(90) == 1
+    assert not os.path.exists(path)
+
+    assert reanalyze.reanalyze_all(workers=1, chunk_size=1, flush_every=1) == 1
+    scan = scan_manager.get_scan_by_id("cold")
+    assert scan.analysis_id != "stale"
+    assert scan_manager.get_analysis_result("cold").id == scan.analysis_id
+    assert scan.storage_tier == "cold" and not os.path.exists(path)
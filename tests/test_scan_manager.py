@@ -0,0 +1,39 @@
+import os
+import threading
+from app.services import scan_manager
+
+
+def test_concurrent_metadata_writes_keep_every_scan(upload_dir):
+    def create(prefix):
+        for i in range(30):
+            scan_manager.create_scan_metadata(
+                scan_id=f"{prefix}-{i}",
+                filename="scan.obj",
+                file_path=os.path.join(upload_dir, f"{prefix}-{i}.obj"),
+                file_size=1,
+                file_format="obj",
+            )
+
+    threads = [threading.Thread(target=create, args=(prefix,)) for prefix in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(scan_manager.load_metadata()) == 60
+    assert not [name for name in os.listdir(upload_dir) if name.endswith(".tmp")]
+
+
+def test_atomic_file_keeps_old_content_on_error(upload_dir):
+    path = os.path.join(upload_dir, "data.json")
+    scan_manager.write_json_atomic(path, {"a": 1})
+    try:
+        with scan_manager.atomic_file(path) as f:
+            f.write("partial")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    with open(path) as f:
+        assert '"a": 1' in f.read()
+    assert os.listdir(upload_dir) == ["data.json"]
@@ -0,0 +1,70 @@
+import os
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.services import landmark_extractor
+from app.services.vertex_cache import sidecar_paths
+
+OBJ = "".join(f"v {x} {y} {z}\n" for x, y, z in np.random.default_rng(0).normal(size=(200, 3)).round(4))
+
+
+@pytest.fixture
+def mesh(upload_dir):
+    path = os.path.join(upload_dir, "scan.obj")
+    with open(path, "w") as f:
+        f.write(OBJ)
+    return path
+
+
+def fail_to_parse(monkeypatch):
+    def parse(path):
+        raise AssertionError("mesh was parsed instead of read from the cache")
+    monkeypatch.setattr(landmark_extractor, "load_normalized_vertices", parse)
+
+
+def test_second_extraction_reads_the_sidecar(monkeypatch, mesh):
+    first = landmark_extractor.get_normalized_vertices(mesh)
+    assert len(sidecar_paths(mesh)) == 1
+
+    fail_to_parse(monkeypatch)
+    second = landmark_extractor.get_normalized_vertices(mesh)
+    assert isinstance(second, np.memmap)
+    np.testing.assert_array_equal(first, second)
+    assert landmark_extractor.extract_landmarks_from_mesh(mesh).points.shape == (10, 3)
+
+
+def test_changed_file_rebuilds_the_sidecar(mesh):
+    landmark_extractor.get_normalized_vertices(mesh)
+    [old_sidecar] = sidecar_paths(mesh)
+
+    with open(mesh, "a") as f:
+        f.write("v 9 9 9\n")
+    vertices = landmark_extractor.get_normalized_vertices(mesh)
+    assert len(vertices) == 201
+    [new_sidecar] = sidecar_paths(mesh)
+    assert new_sidecar != old_sidecar and not os.path.exists(old_sidecar)
+
+
+def test_extractor_version_bump_rebuilds_the_sidecar(monkeypatch, mesh):
+    landmark_extractor.get_normalized_vertices(mesh)
+    [old_sidecar] = sidecar_paths(mesh)
+
+    monkeypatch.setattr(landmark_extractor, "EXTRACTOR_VERSION", landmark_extractor.EXTRACTOR_VERSION + 1)
+    landmark_extractor.get_normalized_vertices(mesh)
+    [new_sidecar] = sidecar_paths(mesh)
+    assert f".v{landmark_extractor.EXTRACTOR_VERSION}-" in new_sidecar
+    assert not os.path.exists(old_sidecar)
+
+
+def test_disabled_cache_always_parses(monkeypatch, mesh):
+    monkeypatch.setattr(settings, "VERTEX_CACHE", False)
+    landmark_extractor.get_normalized_vertices(mesh)
+    assert sidecar_paths(mesh) == []
+
+    # even an existing sidecar is ignored
+    monkeypatch.setattr(settings, "VERTEX_CACHE", True)
+    landmark_extractor.get_normalized_vertices(mesh)
+    monkeypatch.setattr(settings, "VERTEX_CACHE", False)
+    fail_to_parse(monkeypatch)
+    with pytest.raises(AssertionError, match="parsed"):
+        landmark_extractor.get_normalized_vertices(mesh)